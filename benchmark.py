@@ -0,0 +1,264 @@
+"""
+Synthetic-catalog benchmark for the grant_agent.py ingest/score/save pipeline.
+
+    python benchmark.py                          # 1k and 10k grants
+    python benchmark.py --sizes 10000 100000 --out bench.json
+    python benchmark.py --compare old.json       # ratios against a previous run
+
+Every run happens in a temporary directory, so the real grants.js, logs and
+backups are never touched. Results are printed as a table and written as
+JSON (one record per size x operation) so commits can be compared, along
+with what the loaded catalog keeps in memory per 100k grants (Grant records
+vs plain dicts).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import grant_agent as ga
+
+PROVIDERS = ['National Science Foundation', 'European Innovation Council', 'Y Combinator', 'Google',
+             'Epic Games', 'UNICEF', 'Startup India', 'Techstars', 'Microsoft', 'Gates Foundation',
+             'Innovate UK', 'Andreessen Horowitz', 'AWS', 'Mozilla', 'Wellcome Trust']
+PROGRAM_WORDS = ['Innovation', 'Seed', 'Accelerator', 'Fellowship', 'Fund', 'Challenge', 'Grant',
+                 'Residency', 'Prize', 'Lab', 'Catalyst', 'Impact', 'Frontier', 'Pioneer', 'Launchpad']
+SECTORS = ga.SECTOR_CATEGORIES + ['Health', 'DeepTech', 'Social Impact', 'Non-Profit', 'Energy', 'R&D']
+FUNDING_TYPES = ['Grant', 'Grant (Non-dilutive)', 'Equity', 'Equity ($125k for 7%)', 'Cloud Credits',
+                 'Grant + Support', 'Mentorship + Hardware', 'Salary + Equity', 'Equity-Free Support']
+COUNTRIES = ['Global', 'USA', 'India', 'Europe', 'UK', 'Latin America', 'Global (Remote Friendly)']
+SOURCE_CATEGORIES = (['Gov'] * 3 + ['Private'] * 3 + ['Accelerator'] * 2 + ['VC', 'Corporate', 'Non-Profit'])
+SUMMARY_WORDS = ['startups', 'founders', 'students', 'researchers', 'early', 'stage', 'open', 'source',
+                 'women', 'led', 'climate', 'AI', 'first', 'teams', 'building', 'products', 'MVP', 'revenue']
+
+
+def random_deadline(rng, today):
+    roll = rng.random()
+    if roll < 0.70:
+        return (today + timedelta(days=rng.randint(-30, 365))).strftime("%Y-%m-%d")
+    if roll < 0.85:
+        return 'Rolling'
+    if roll < 0.90:
+        return 'Open all year'
+    return rng.choice(['TBD', 'March 1, 2026', 'Q3 2026', 'Varies'])
+
+
+def random_funding(rng):
+    roll = rng.random()
+    amount = rng.choice([5, 10, 25, 50, 100, 150, 250, 500, 1000]) * 1000
+    if roll < 0.40:
+        return f"${amount:,}"
+    if roll < 0.60:
+        return f"${amount // 10:,} - ${amount:,}"
+    if roll < 0.70:
+        return f"${amount:,} (Cloud Credits)"
+    if roll < 0.80:
+        return f"Up to ₹{rng.randint(1, 5)} Crore"
+    if roll < 0.88:
+        return f"€{amount // 1000}k"
+    if roll < 0.94:
+        return f"${amount:,} / year"
+    return 'Unknown'
+
+
+def generate_catalog(n, seed=42, duplicate_rate=0.05, update_rate=0.5):
+    """
+    Seeded synthetic findings. About `duplicate_rate` of them reuse an earlier
+    program/provider; `update_rate` of those also change their deadline, so
+    ingest exercises ADDED, UPDATED and DUPLICATE paths.
+    """
+    rng = random.Random(seed)
+    today = datetime.now()
+    findings = []
+    for i in range(n):
+        if findings and rng.random() < duplicate_rate:
+            dup = dict(rng.choice(findings))
+            if rng.random() < update_rate:
+                dup['deadline'] = random_deadline(rng, today)
+            findings.append(dup)
+            continue
+        words = rng.sample(PROGRAM_WORDS, 2)
+        findings.append({
+            "program_name": f"{words[0]} {words[1]} {i}",
+            "provider": rng.choice(PROVIDERS),
+            "country": rng.choice(COUNTRIES),
+            "sector_focus": ", ".join(rng.sample(SECTORS, rng.randint(1, 3))),
+            "funding_type": rng.choice(FUNDING_TYPES),
+            "funding_amount": random_funding(rng),
+            "eligibility_summary": " ".join(rng.choice(SUMMARY_WORDS) for _ in range(rng.randint(4, 12))) + ".",
+            "deadline": random_deadline(rng, today),
+            "application_link": f"https://example.org/programs/{i}",
+            "source_category": rng.choice(SOURCE_CATEGORIES),
+            "effort_level": rng.choice(['Low', 'Medium', 'High']),
+            "awards_available": f"{rng.randint(1, 300)} Awards",
+            "open_date": (today - timedelta(days=rng.randint(0, 120))).strftime("%Y-%m-%d"),
+        })
+    return findings
+
+
+class Bench:
+    def __init__(self, trace_memory=True):
+        self.trace_memory = trace_memory
+        self.results = []
+
+    def measure(self, size, op, items, fn):
+        """
+        Runs fn() once, silencing its prints; records seconds, throughput, and
+        the peak and still-allocated (retained) traced memory.
+        """
+        if self.trace_memory:
+            tracemalloc.start()
+        started = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            value = fn()
+        seconds = time.perf_counter() - started
+        peak_kb = retained_kb = None
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            peak_kb, retained_kb = round(peak / 1024, 1), round(current / 1024, 1)
+            tracemalloc.stop()
+        self.results.append({
+            "size": size, "op": op, "items": items, "seconds": round(seconds, 6),
+            "per_sec": round(items / seconds, 1) if seconds > 0 else None, "peak_kb": peak_kb,
+            "retained_kb": retained_kb,
+        })
+        return value
+
+
+def bench_size(bench, n, seed, batch_size, log_runs, storage_mode='snapshot'):
+    findings = generate_catalog(n, seed)
+
+    manager = ga.GrantManager(storage_mode=storage_mode)
+
+    def ingest():
+        for i in range(0, len(findings), batch_size):
+            manager.add_grants([dict(f) for f in findings[i:i + batch_size]])
+    bench.measure(n, 'add_grants', n, ingest)
+
+    extra = generate_catalog(min(n, 1000), seed + 1)
+    bench.measure(n, 'add_grant', len(extra), lambda: [manager.add_grant(dict(f)) for f in extra])
+
+    grants = manager.grants
+    now = datetime.now()
+    bench.measure(n, 'calculate_score', len(grants),
+                  lambda: [manager.scorer.calculate_score(g, now) for g in grants])
+    bench.measure(n, 'score_many', len(grants), lambda: manager.scorer.score_many(grants, now=now))
+    bench.measure(n, 'check_deadlines', len(grants), lambda: manager.alerter.check_deadlines(grants))
+    bench.measure(n, 'run_deadline_check', len(grants), manager.run_deadline_check)
+    bench.measure(n, 'save_grants', len(grants), manager.save_grants)
+    manager.backups.wait()  # Backups are written in the background; finish before the tempdir goes
+
+    # What the loaded catalog (records + indexes) keeps allocated, compact Grant records vs plain dicts
+    for op, compact in (('load_grants', True), ('load_grants_dict', False)):
+        loader = ga.GrantManager(storage_mode=storage_mode)
+        loader.compact = compact
+        bench.measure(n, op, len(grants), loader.load_grants)
+
+    auditor = ga.Auditor()
+    bench.measure(n, 'log_run', log_runs,
+                  lambda: [auditor.log_run(n, i, metrics={"catalog_size": n}) for i in range(log_runs)])
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def print_table(results, baseline=None):
+    base = {(r['size'], r['op']): r for r in (baseline or [])}
+    print(f"{'size':>9}  {'op':<20}{'seconds':>10}{'items/s':>14}{'peak KB':>12}" + ("   vs base" if base else ""))
+    for r in results:
+        line = (f"{r['size']:>9}  {r['op']:<20}{r['seconds']:>10.4f}"
+                f"{(r['per_sec'] or 0):>14,.0f}{(r['peak_kb'] if r['peak_kb'] is not None else float('nan')):>12,.0f}")
+        old = base.get((r['size'], r['op']))
+        if old and old['seconds']:
+            line += f"   x{r['seconds'] / old['seconds']:.2f}"
+        print(line)
+
+
+def catalog_memory(results):
+    """{size: {op: MB per 100k grants}} retained after load_grants / load_grants_dict."""
+    out = {}
+    for r in results:
+        if r['op'] in ('load_grants', 'load_grants_dict') and r.get('retained_kb') is not None and r['items']:
+            out.setdefault(r['size'], {})[r['op']] = round(r['retained_kb'] / 1024 / r['items'] * 100000, 1)
+    return out
+
+
+def print_memory(memory):
+    if not memory:
+        return
+    print("\nCatalog memory per 100k grants (records + indexes, retained after load):")
+    for size, ops in memory.items():
+        compact, plain = ops.get('load_grants'), ops.get('load_grants_dict')
+        line = f"{size:>9}  Grant records {compact:>8,.1f} MB   dicts {plain:>8,.1f} MB"
+        if compact and plain:
+            line += f"   x{compact / plain:.2f}"
+        print(line)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=1000, help="findings per add_grants call")
+    parser.add_argument('--storage', default='snapshot', choices=sorted(ga.STORAGE_BACKENDS),
+                        help="GrantManager storage backend to save/load with")
+    parser.add_argument('--log-runs', type=int, default=50, help="Auditor.log_run calls per size")
+    parser.add_argument('--no-tracemalloc', action='store_true', help="skip peak-memory tracing (faster, purer timings)")
+    parser.add_argument('--out', default='bench_results.json', help="machine-readable results")
+    parser.add_argument('--compare', metavar='JSON', help="previous results to show ratios against")
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+    out_path = os.path.abspath(args.out)
+
+    ga.WEBHOOK_URL = None  # Never post alerts from a benchmark
+    bench = Bench(trace_memory=not args.no_tracemalloc)
+    cwd = os.getcwd()
+    for n in args.sizes:
+        with tempfile.TemporaryDirectory(prefix='grant-bench-') as workdir:
+            os.chdir(workdir)
+            try:
+                bench_size(bench, n, args.seed, args.batch_size, args.log_runs, args.storage)
+            finally:
+                os.chdir(cwd)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec='seconds'),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": getattr(ga.np, '__version__', None),
+            "seed": args.seed,
+            "batch_size": args.batch_size,
+            "storage": args.storage,
+            "tracemalloc": not args.no_tracemalloc,
+        },
+        "results": bench.results,
+        "catalog_mb_per_100k": catalog_memory(bench.results),
+    }
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print_table(bench.results, baseline)
+    print_memory(report['catalog_mb_per_100k'])
+    print(f"\nResults written to {out_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -4,19 +4,719 @@ import time
 import random
 import os
 import hashlib
+import functools
+import abc
+import operator
+import argparse
+import cProfile
+import pstats
+import contextlib
+import bisect
+import heapq
+import zlib
+import sqlite3
 from datetime import datetime, timedelta
 import shutil
+import gzip
+import tempfile
 import sys
 import urllib.request
 import urllib.error
+import urllib.parse
+import http.client
+import threading
+import signal
+import concurrent.futures
+import multiprocessing
+import collections.abc
+import http.server
+from xml.etree import ElementTree
+
+try:
+    import numpy as np  # Optional: speeds up GrantScorer.score_many
+except ImportError:
+    np = None
 
 # --- CONFIGURATION ---
 GRANTS_FILE = 'grants.js'
 LOGS_DIR = 'logs'
-LOG_FILE = os.path.join(LOGS_DIR, 'agent_log.json')
-BACKUP_DIR = 'backups'
+LOG_FILE = os.path.join(LOGS_DIR, 'agent_log.jsonl')  # Append-only, one run per line
+LEGACY_LOG_FILE = os.path.join(LOGS_DIR, 'agent_log.json')  # Old rewrite-everything format, migrated once
+LOG_ROTATE_BYTES = 1024 * 1024  # Rotate the active log past this size...
+LOG_ROTATE_DAYS = 30            # ...or once its first entry is this old
+LOG_COMPRESS_ROTATED = True     # gzip rotated segments
+BACKUP_DIR = 'backups'  # Content-addressed, gzipped catalog snapshots, see BackupStore
+BACKUP_DAILY_DAYS = 30  # Keep one snapshot per day this far back, then one per week
+JOURNAL_FILE = 'grants.journal.jsonl'
+STORAGE_MODE = os.environ.get('GRANT_STORAGE_MODE', 'snapshot')  # 'snapshot', 'journal' or 'sqlite', see STORAGE_BACKENDS
+# journal/sqlite keep state outside grants.js, so they are for local runs; CI only persists grants.js
+GRANTS_DB = 'grants.db'  # sqlite mode only
+JOURNAL_COMPACT_BYTES = 1024 * 1024  # Fold the journal into grants.js past this size...
+JOURNAL_COMPACT_AGE_DAYS = 7         # ...or when the snapshot is older than this
+SOURCES_FILE = 'sources.json'  # Scan sources, see load_sources
+PROFILE_FILE = 'profile.json'  # Eligibility keywords, see load_profile (built-in rules when missing)
+PROFILES_FILE = 'profiles.json'  # Several profiles to rank the catalog for, see ProfileRanker
+RANK_TOP_K = 25       # Grants kept per profile ranking (a profile may set "top_k")
+RANK_ALERT_SCORE = 85  # Alert a profile about ranked grants scoring above this (a profile may set "alert_score")
+FETCH_TIMEOUT = 20        # Seconds per source request
+SCAN_TIMEOUT = 300        # Seconds for the whole scan; unfinished sources are reported as errors
+SCAN_MAX_WORKERS = 8
+SCAN_PER_HOST_LIMIT = 2   # Concurrent requests per host
+USER_AGENT = 'GrantHunterAgent/2.1'
+ALERT_DEADLINE_DAYS = [7, 3]  # Deadline alert windows: alert when exactly this many days are left
+CLOSED_STATUSES = ['Applied', 'Rejected', 'Awarded']
+ALERT_OUTBOX_FILE = os.path.join(LOGS_DIR, 'alert_outbox.json')  # Pending alerts + sent idempotency keys
+ALERT_WORKERS = 2          # Delivery threads, each with its own keep-alive connection
+ALERT_BATCH_SIZE = 1       # >1 posts {"alerts": [...]} batches; needs a receiver that accepts them
+ALERT_BATCH_LINGER = 0.5   # Seconds a worker waits for a batch to fill up (batching only)
+ALERT_TIMEOUT = 10         # Seconds per webhook request
+ALERT_MAX_ATTEMPTS = 5     # Then the alert is marked failed
+ALERT_RETRY_BASE = 2       # Seconds; doubles each attempt
+ALERT_RETRY_MAX = 300
+ALERT_FLUSH_TIMEOUT = 60   # How long a run waits for the outbox to drain; the rest waits for the next run
+ALERT_SAVE_INTERVAL = 1.0  # Seconds between outbox writes by the delivery threads (flush() always writes)
+ALERT_KEY_RETENTION_DAYS = 30
+CACHE_DIR = os.path.join('.cache', 'http')  # Conditional-GET cache for scan sources
+CACHE_MAX_BYTES = 50 * 1024 * 1024          # LRU-evicted beyond this
+ENRICH_WORKERS = int(os.environ.get('GRANT_ENRICH_WORKERS', '0')) or (os.cpu_count() or 1)  # Process pool size
+ENRICH_CHUNK_SIZE = 500       # Findings per task sent to an enrichment worker
+ENRICH_PARALLEL_MIN = 2000    # Smaller add_grants batches are enriched serially (pool start-up isn't worth it)
+EXPORT_DIR = 'data'  # Sharded dashboard export (manifest.js + grants-<shard>.js), see DashboardExporter
+EXPORT_SHARD_BY = os.environ.get('GRANT_EXPORT_SHARD_BY', 'priority')  # 'priority' or 'deadline'
+EXPORT_GZIP_LEVEL = 6  # .gz copies; 9 costs ~4x the time for ~1% smaller files
+COMPACT_GRANTS = True  # Keep the in-memory catalog as Grant records (slots + interned values) instead of dicts
+NEAR_DUP_THRESHOLD = 0.8  # Estimated Jaccard similarity at which two grants count as the same program
+NEAR_DUP_MODE = os.environ.get('GRANT_NEAR_DUP_MODE', 'flag')  # 'flag' (keep both, mark the new one) or 'merge'
+NEAR_DUP_PERMUTATIONS = 64  # MinHash signature length
+NEAR_DUP_BANDS = 16         # LSH bands; 64 / 16 = 4 rows per band
+DAEMON_SCAN_INTERVAL = int(os.environ.get('GRANT_DAEMON_SCAN_INTERVAL', 6 * 3600))  # Seconds between scans in --daemon mode
+DAEMON_DEADLINE_INTERVAL = 3600  # Re-score + deadline alerts
+DAEMON_SAVE_INTERVAL = 300       # Persist in-memory changes
+DAEMON_WATCH_INTERVAL = 5        # Check grants.js for outside edits (git pull, restore, hand edits)
+DAEMON_HOST = '127.0.0.1'        # /health and /stats are only served locally
+DAEMON_PORT = int(os.environ.get('GRANT_DAEMON_PORT', 8765))
 WEBHOOK_URL = os.environ.get('GRANT_ALERT_WEBHOOK')  # Set this in GitHub Secrets
 
+# --- PERSISTENCE HELPERS ---
+def atomic_write_bytes(path, data):
+    """Writes via a temp file + rename so a crash mid-write never leaves a truncated file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+    return len(data)
+
+def atomic_write_text(path, text):
+    """Same as atomic_write_bytes for UTF-8 text. Returns the number of bytes written."""
+    return atomic_write_bytes(path, text.encode('utf-8'))
+
+def snapshot_bytes(grants):
+    """The grants.js file contents for a catalog."""
+    return f"window.grantsData = {json.dumps(grants, indent=2, default=grant_json)};".encode('utf-8')
+
+class GrantsFileError(ValueError):
+    """Raised when grants.js (or its journal) cannot be parsed. Never silently treated as an empty catalog."""
+
+JS_PREFIX = 'window.grantsData'
+_JSON_DECODER = json.JSONDecoder()
+_WS = ' \t\r\n'
+
+def iter_grants_file(path, chunk_size=64 * 1024):
+    """
+    Streams grant objects out of a grants.js file (or a plain JSON array) one
+    at a time. Reads in chunks and skips the `window.grantsData =` prefix in
+    place, so peak memory is one chunk plus one grant rather than several
+    copies of the whole file. Raises GrantsFileError on malformed input.
+    """
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        buf = f.read(chunk_size)
+        pos = 0
+        eof = not buf
+
+        def fill():
+            # Drops the consumed prefix and appends the next chunk; False at EOF
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip_ws():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS: pos += 1
+                if pos < len(buf) or not fill(): return
+
+        def fail(msg):
+            raise GrantsFileError(f"{path}: {msg} (near: {buf[pos:pos + 40]!r})")
+
+        skip_ws()
+        while len(buf) - pos < len(JS_PREFIX) and fill(): pass
+        if buf.startswith(JS_PREFIX, pos):
+            pos += len(JS_PREFIX)
+            skip_ws()
+            # Exactly the identifier: `window.grantsDataX = [...]` is not our file
+            if pos >= len(buf) or buf[pos] != '=': fail("expected '=' after window.grantsData")
+            pos += 1
+            skip_ws()
+        if pos >= len(buf) or buf[pos] != '[':
+            fail("expected a JSON array of grants")
+        pos += 1
+
+        first = True
+        while True:
+            skip_ws()
+            if pos >= len(buf): fail("unexpected end of file inside the grants array")
+            if buf[pos] == ']':
+                pos += 1
+                break
+            if not first:
+                if buf[pos] != ',': fail("expected ',' between grants")
+                pos += 1
+                skip_ws()
+            while True:
+                try:
+                    grant, end = _JSON_DECODER.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError as e:
+                    # Most likely the object straddles a chunk boundary
+                    if not fill(): fail(f"invalid grant object: {e.msg}")
+            if not isinstance(grant, dict): fail("expected a grant object")
+            pos = end
+            first = False
+            yield grant
+
+        skip_ws()
+        if pos < len(buf) and buf[pos] == ';':
+            pos += 1
+            skip_ws()
+        if pos < len(buf): fail("unexpected trailing content")
+
+def iter_journal_file(path):
+    """Yields journal records line by line. A torn final line (crash mid-append) is skipped."""
+    with open(path, 'r', encoding='utf-8') as f:
+        bad_lineno = None
+        for lineno, line in enumerate(f, 1):
+            if not line.strip(): continue
+            if bad_lineno is not None:
+                raise GrantsFileError(f"{path}: corrupt record on line {bad_lineno}")
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                bad_lineno = lineno
+        if bad_lineno is not None:
+            print(f"⚠️ Ignoring torn last record in {path}")
+
+def truncate_torn_tail(path, chunk_size=64 * 1024):
+    """
+    Cuts a journal back to its last complete line. A crash mid-append leaves a
+    torn record with no newline; appending after it would glue the next record
+    onto the same line and lose it. Returns the number of bytes dropped.
+    """
+    with open(path, 'rb+') as f:
+        end = f.seek(0, os.SEEK_END)
+        if end == 0:
+            return 0
+        f.seek(end - 1)
+        if f.read(1) == b'\n':
+            return 0
+        pos = end
+        while pos > 0:
+            start = max(0, pos - chunk_size)
+            f.seek(start)
+            nl = f.read(pos - start).rfind(b'\n')
+            if nl != -1:
+                pos = start + nl + 1
+                break
+            pos = start
+        f.truncate(pos)
+        f.flush()
+        os.fsync(f.fileno())
+    print(f"⚠️ Dropped a torn {end - pos}-byte record from the end of {path}")
+    return end - pos
+
+# --- INSTRUMENTATION ---
+class Instrumentation:
+    """
+    Timing spans and counters for the hot paths (enabled by --profile).
+    Disabled, an @instrumented function costs one attribute check and
+    span() returns a shared no-op context, so this stays in production code.
+    Span times are inclusive: add_grants includes the calculate_score calls it makes.
+    """
+    def __init__(self):
+        self.enabled = False
+        self.spans = {}     # name -> [calls, total_seconds, max_seconds]
+        self.counters = {}
+        self.lock = threading.Lock()
+
+    def enable(self):
+        self.enabled = True
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.counters = {}
+
+    def record(self, name, elapsed):
+        with self.lock:
+            stat = self.spans.get(name)
+            if stat is None:
+                self.spans[name] = [1, elapsed, elapsed]
+            else:
+                stat[0] += 1
+                stat[1] += elapsed
+                if elapsed > stat[2]: stat[2] = elapsed
+
+    def count(self, name, amount=1):
+        if not self.enabled: return
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def span(self, name):
+        return _Span(self, name) if self.enabled else _NO_SPAN
+
+    def snapshot(self):
+        """Span totals and counters in a JSON-friendly shape, e.g. for the run log."""
+        with self.lock:
+            return {
+                "spans": {name: {"calls": c, "total_ms": round(t * 1000, 3), "max_ms": round(m * 1000, 3)}
+                          for name, (c, t, m) in self.spans.items()},
+                "counters": dict(self.counters),
+            }
+
+    def report(self):
+        """Per-stage breakdown table, slowest first."""
+        lines = [f"{'stage':<34}{'calls':>8}{'total ms':>12}{'avg ms':>10}{'max ms':>10}"]
+        with self.lock:
+            rows = sorted(self.spans.items(), key=lambda kv: -kv[1][1])
+            for name, (calls, total, longest) in rows:
+                lines.append(f"{name:<34}{calls:>8}{total * 1000:>12.2f}{total * 1000 / calls:>10.3f}{longest * 1000:>10.2f}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:<34}{value:>8}")
+        return "\n".join(lines)
+
+class _Span:
+    __slots__ = ('instr', 'name', 'started')
+
+    def __init__(self, instr, name):
+        self.instr = instr
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.instr.record(self.name, time.perf_counter() - self.started)
+        return False
+
+class _NoSpan:
+    __slots__ = ()
+    def __enter__(self): return self
+    def __exit__(self, *exc): return False
+
+_NO_SPAN = _NoSpan()
+INSTRUMENTS = Instrumentation()
+
+def instrumented(name):
+    """Decorator: records a span per call while INSTRUMENTS is enabled."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not INSTRUMENTS.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                INSTRUMENTS.record(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+# --- NORMALIZATION ---
+# Free-text fields are parsed once at ingest (GrantManager.load_grants/add_grant)
+# into canonical derived fields that the scorer, alerts and dashboard read directly.
+DEADLINE_OPEN = 'OPEN'        # "Open all year"
+DEADLINE_ROLLING = 'ROLLING'  # "Rolling", "Ongoing", ...
+DEADLINE_DATE = 'DATE'
+DEADLINE_UNKNOWN = 'UNKNOWN'
+
+FUNDING_GRANT = 'GRANT'
+FUNDING_EQUITY = 'EQUITY'
+FUNDING_CREDITS = 'CREDITS'
+FUNDING_OTHER = 'OTHER'
+
+# Dashboard sector filters (index.html) plus the category the scorer penalizes
+SECTOR_CATEGORIES = ['AI', 'Gaming', 'App Dev', 'EdTech', 'Web3', 'Climate', 'SaaS']
+CATEGORY_NON_PROFIT = 'Non-Profit'
+
+# Rough static conversion rates; funding bounds are for ranking, not accounting
+FX_TO_USD = {'$': 1.0, 'USD': 1.0, '€': 1.08, 'EUR': 1.08, '£': 1.27, 'GBP': 1.27, '₹': 0.012, 'INR': 0.012}
+FUNDING_UNITS = {'k': 1e3, 'm': 1e6, 'mn': 1e6, 'million': 1e6, 'b': 1e9, 'bn': 1e9, 'billion': 1e9,
+                 'lakh': 1e5, 'lakhs': 1e5, 'cr': 1e7, 'crore': 1e7, 'crores': 1e7}
+
+# Fields a source provides. Their fingerprint decides whether a re-scanned grant changed at all;
+# everything else on a grant is derived from them or is our own tracking state.
+SOURCE_FIELDS = ['program_name', 'provider', 'country', 'sector_focus', 'funding_type', 'funding_amount',
+                 'eligibility_summary', 'deadline', 'application_link', 'source_category', 'effort_level',
+                 'awards_available', 'open_date', 'required_documents']
+SOURCE_FIELD_DEFAULTS = {'source_category': 'Private', 'awards_available': 'Unknown', 'open_date': 'Unknown'}
+# Tracking state that, together with the fingerprints, makes up the catalog fingerprint
+RECORD_STATE_FIELDS = ['status', 'notes', 'relevance_score', 'priority', 'added_date', 'last_updated',
+                       'near_duplicate_of', 'near_duplicate_score']
+
+ROLLING_RE = re.compile(r'\b(rolling|ongoing|continuous)\b', re.IGNORECASE)
+SEARCH_TOKEN_RE = re.compile(r'[a-z0-9]+')
+SECTOR_RE = re.compile('|'.join(re.escape(c) for c in SECTOR_CATEGORIES))
+FUNDING_AMOUNT_RE = re.compile(
+    r'(?P<cur>[$€£₹]|USD|EUR|GBP|INR)?\s*'
+    r'(?P<num>\d[\d,]*(?:\.\d+)?)(?![\d,])'
+    r'(?:\s*(?P<unit>k|mn|m|million|bn|b|billion|lakhs?|crores?|cr)\b)?'
+    r'(?:\s*(?P<cur2>USD|EUR|GBP|INR)\b)?'
+    r'(?!\s*%)',
+    re.IGNORECASE)
+
+@functools.lru_cache(maxsize=4096)
+def parse_deadline(deadline):
+    """Returns (kind, ordinal) for a deadline string. ordinal is only set for DATE."""
+    if deadline.lower() == 'open all year':
+        return DEADLINE_OPEN, None
+    try:
+        # Basic date parsing (assuming YYYY-MM-DD or simple standard formats)
+        return DEADLINE_DATE, datetime.strptime(deadline, "%Y-%m-%d").toordinal()
+    except (ValueError, TypeError):
+        pass
+    if ROLLING_RE.search(deadline):
+        return DEADLINE_ROLLING, None
+    return DEADLINE_UNKNOWN, None
+
+@functools.lru_cache(maxsize=4096)
+def parse_funding_amount(funding_amount):
+    """
+    Returns (min_usd, max_usd) for strings like "$5,000 - $500,000",
+    "$350,000 (Cloud Credits)" or "Up to ₹1 Crore". (None, None) if no amount.
+    Bare numbers without a currency or unit (e.g. "0% Equity") are ignored.
+    """
+    amounts = []
+    currency = None
+    for m in FUNDING_AMOUNT_RE.finditer(funding_amount or ''):
+        cur = m.group('cur') or m.group('cur2')
+        unit = m.group('unit')
+        if not (cur or unit):
+            continue
+        currency = (cur or currency or '$').upper()
+        value = float(m.group('num').replace(',', '') or 0)
+        if unit:
+            value *= FUNDING_UNITS[unit.lower()]
+        amounts.append(value * FX_TO_USD[currency])
+    if not amounts:
+        return None, None
+    return int(round(min(amounts))), int(round(max(amounts)))
+
+@functools.lru_cache(maxsize=1024)
+def classify_funding_type(funding_type):
+    # Precedence mirrors the scorer: Credits beats Grant beats Equity
+    if "Credits" in funding_type: return FUNDING_CREDITS
+    if "Grant" in funding_type: return FUNDING_GRANT
+    if "Equity" in funding_type: return FUNDING_EQUITY
+    return FUNDING_OTHER
+
+@functools.lru_cache(maxsize=1024)
+def classify_sector(sector_focus):
+    categories = []
+    for c in SECTOR_RE.findall(sector_focus):
+        if c not in categories: categories.append(c)
+    if "non-profit" in sector_focus.lower():
+        categories.append(CATEGORY_NON_PROFIT)
+    return tuple(categories)
+
+def content_fingerprint(grant):
+    """Short hash of the grant's SOURCE_FIELDS (with enrichment defaults applied)."""
+    values = [grant.get(k, SOURCE_FIELD_DEFAULTS.get(k)) for k in SOURCE_FIELDS]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+def source_text(grant, key):
+    """A free-text source field, or '' if it is missing or not a string (a feed's null or number)."""
+    value = grant.get(key)
+    return value if isinstance(value, str) else ''
+
+def normalized_fields(grant):
+    """Derived canonical fields for a grant, computed from its free-text source fields."""
+    deadline_kind, deadline_ordinal = parse_deadline(source_text(grant, 'deadline'))
+    funding_min, funding_max = parse_funding_amount(source_text(grant, 'funding_amount'))
+    return {
+        "deadline_kind": deadline_kind,
+        "deadline_ordinal": deadline_ordinal,
+        "funding_min_usd": funding_min,
+        "funding_max_usd": funding_max,
+        "funding_kind": classify_funding_type(source_text(grant, 'funding_type')),
+        "categories": list(classify_sector(source_text(grant, 'sector_focus'))),
+        "fingerprint": content_fingerprint(grant),
+    }
+
+def normalize_grant(grant):
+    """Stamps the derived fields onto the grant in place."""
+    grant.update(normalized_fields(grant))
+    return grant
+
+def restore_grant(grant):
+    """
+    normalize_grant for a grant read back from storage: the stored derived fields
+    are kept as long as its stored fingerprint still matches its source fields,
+    so loading hashes each grant but doesn't re-parse deadlines, amounts or sectors.
+    """
+    if (grant.get('fingerprint') != content_fingerprint(grant)
+            or any(k not in grant for k in GRANT_DERIVED_FIELDS)):
+        normalize_grant(grant)
+    return grant
+
+def grant_id(grant):
+    unique_string = f"{grant.get('program_name','')}|{grant.get('provider','')}"
+    return hashlib.md5(unique_string.encode()).hexdigest()
+
+def prepare_grant(grant):
+    """Migrates a stored grant (older files have no id) and restores its derived fields."""
+    if 'id' not in grant: grant['id'] = grant_id(grant)
+    return restore_grant(grant)
+
+def days_base(now):
+    """
+    Ordinal such that deadline_ordinal - base == (deadline_date - now).days.
+    A deadline is midnight, so any time past midnight today costs one more day.
+    """
+    midnight = now.hour == 0 and now.minute == 0 and now.second == 0 and now.microsecond == 0
+    return now.toordinal() + (0 if midnight else 1)
+
+# --- CLASS: GRANT RECORD ---
+# Few distinct values each: one shared (interned) string per value instead of one per grant
+GRANT_CATEGORICAL_FIELDS = ['country', 'source_category', 'funding_type', 'status', 'priority', 'effort_level',
+                            'deadline_kind', 'funding_kind', 'awards_available']
+GRANT_DATE_FIELDS = ['deadline', 'open_date', 'added_date', 'last_updated']  # Kept as text, interned the same way
+GRANT_DERIVED_FIELDS = ['deadline_kind', 'deadline_ordinal', 'funding_min_usd', 'funding_max_usd', 'funding_kind',
+                        'categories', 'fingerprint']
+GRANT_FIELDS = tuple(dict.fromkeys(SOURCE_FIELDS + ['id'] + GRANT_DERIVED_FIELDS + RECORD_STATE_FIELDS))
+_GRANT_FIELD_SET = frozenset(GRANT_FIELDS)
+_GRANT_INTERNED = frozenset(GRANT_CATEGORICAL_FIELDS + GRANT_DATE_FIELDS)
+_SHARED = {}  # Key orders and category tuples -> the one instance every grant points at
+_KEY_GETTERS = {}  # key order -> attrgetter for all of them, when they are all slots (see Grant.to_dict)
+
+def _shared(value):
+    return _SHARED.setdefault(value, value)
+
+class Grant(collections.abc.MutableMapping):
+    """
+    Compact in-memory grant (GrantManager keeps its catalog as these when
+    COMPACT_GRANTS is set). Known fields live in __slots__ instead of a
+    per-grant dict, categorical and date strings are interned, categories is
+    a shared tuple, and the key order is a shared tuple too. It reads and
+    writes like the dict it was built from (g['x'], get, update, pop, `in`),
+    so the rest of the agent doesn't care which one it gets; to_dict() is the
+    exact grants.js object again, keys in their original order, and json.dumps
+    takes Grants with default=grant_json.
+    """
+    __slots__ = GRANT_FIELDS + ('_keys', '_extra')
+
+    def __init__(self, fields=None, _fields=_GRANT_FIELD_SET, _interned=_GRANT_INTERNED, _intern=sys.intern):
+        extra = None
+        if fields:
+            for key, value in fields.items():
+                if key in _interned:
+                    if type(value) is str: value = _intern(value)
+                elif key == 'categories':
+                    if type(value) is list: value = _shared(tuple(value))
+                elif key not in _fields:
+                    if extra is None: extra = {}
+                    extra[key] = value
+                    continue
+                setattr(self, key, value)
+        self._extra = extra  # Fields this class doesn't know about, kept as they are
+        self._keys = _shared(tuple(map(_intern, fields or ())))
+
+    def __getitem__(self, key):
+        if key in _GRANT_FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _GRANT_FIELD_SET:
+            return getattr(self, key, default)
+        return default if self._extra is None else self._extra.get(key, default)
+
+    def __contains__(self, key):
+        if key in _GRANT_FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._keys = _shared(self._keys + (sys.intern(key),))
+        if key in _GRANT_INTERNED:
+            if type(value) is str: value = sys.intern(value)
+        elif key == 'categories':
+            if type(value) is list: value = _shared(tuple(value))
+        if key in _GRANT_FIELD_SET:
+            setattr(self, key, value)
+        else:
+            if self._extra is None: self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._keys = _shared(tuple(k for k in self._keys if k != key))
+        if key in _GRANT_FIELD_SET:
+            delattr(self, key)
+        else:
+            del self._extra[key]
+            if not self._extra: self._extra = None
+
+    def __iter__(self):
+        return iter(self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __eq__(self, other):
+        if isinstance(other, Grant):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, collections.abc.Mapping):
+            return self.to_dict() == dict(other)
+        return NotImplemented
+
+    def __repr__(self):
+        return f"Grant({self.to_dict()!r})"
+
+    def to_dict(self):
+        keys, extra = self._keys, self._extra
+        if extra is None and len(keys) > 1:
+            getter = _KEY_GETTERS.get(keys)
+            if getter is None:
+                getter = _KEY_GETTERS[keys] = operator.attrgetter(*keys)
+            out = dict(zip(keys, getter(self)))  # One C call for all the fields
+        else:
+            extra = extra or {}
+            out = {key: extra[key] if key in extra else getattr(self, key) for key in keys}
+        if type(out.get('categories')) is tuple:
+            out['categories'] = list(out['categories'])
+        return out
+
+    copy = to_dict  # Like dict.copy: an independent plain dict
+
+def grant_json(obj):
+    """json.dumps default= hook: a Grant serializes as its grants.js object."""
+    if isinstance(obj, Grant):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+# --- CLASS: PROFILE MATCHER ---
+PROFILE_FIELDS = {'eligibility': 'eligibility_summary', 'sector': 'sector_focus', 'country': 'country'}
+_ALNUM = set('abcdefghijklmnopqrstuvwxyz0123456789')  # What the keyword regex treats as word characters
+
+class ProfileMatcher:
+    """
+    Eligibility (0-100) against a profile of weighted keywords, e.g.
+      {"name": "acme", "base": 70,
+       "keywords": {"eligibility": {"student*": -50, "early stage": 15},
+                    "sector": {"ai": 20, "non-profit": -40},
+                    "country": {"india": 10},
+                    "any": {"women": 5}}}
+    Positive weights include, negative exclude; the score is base plus the
+    weights of every distinct keyword found, clamped to 0-100. Keywords match
+    whole words, or as a prefix when they end in "*". All keywords compile
+    into one regex, so each grant field is scanned once however long the
+    profile is: the regex finds the longest keyword at each word start, and
+    the shorter keywords that must also match there are precomputed. Scores
+    are cached per grant fingerprint.
+    """
+    CACHE_MAX = 100000
+
+    def __init__(self, profile):
+        self.profile = profile  # As loaded, so enrichment workers can rebuild the same matcher
+        self.name = profile.get('name', 'default')
+        self.base = profile.get('base', 100)
+        self.top_k = profile.get('top_k', RANK_TOP_K)
+        self.alert_score = profile.get('alert_score', RANK_ALERT_SCORE)
+        self.weights = {}  # (field, keyword) -> weight
+        terms = {}  # keyword -> regex
+        prefixes = set()  # keywords ending in "*"
+        for scope, keywords in profile.get('keywords', {}).items():
+            if scope != 'any' and scope not in PROFILE_FIELDS:
+                raise ValueError(f"Unknown profile keyword field {scope!r}")
+            for keyword, weight in keywords.items():
+                keyword = keyword.lower().strip()
+                prefix = keyword.endswith('*')
+                term = keyword.rstrip('*')
+                if prefix: prefixes.add(term)
+                terms[term] = re.escape(term) + ('' if prefix else r'(?![a-z0-9])')
+                for field in (PROFILE_FIELDS if scope == 'any' else [scope]):
+                    self.weights[(field, term)] = self.weights.get((field, term), 0) + weight
+        ordered = sorted(terms, key=len, reverse=True)
+        # Zero-width lookahead so matches may overlap; alternation order makes the longest keyword win
+        self.regex = re.compile(r'(?<![a-z0-9])(?=(' + '|'.join(terms[t] for t in ordered) + '))') if ordered else None
+        # Where keyword t matches, each shorter keyword that t starts with matches too, if it is a prefix
+        # keyword or ends where a word of t ends
+        self.implied = {t: [t] + [u for u in ordered if len(u) < len(t) and t.startswith(u)
+                                  and (u in prefixes or t[len(u)] not in _ALNUM)] for t in ordered}
+        self.cache = {}  # fingerprint -> score
+
+    def matches(self, grant):
+        """{(field, keyword)} found in the grant."""
+        found = set()
+        if self.regex is None:
+            return found
+        for field, key in PROFILE_FIELDS.items():
+            text = str(grant.get(key) or '').lower()
+            for m in self.regex.finditer(text):
+                for term in self.implied[m.group(1)]:
+                    if (field, term) in self.weights:
+                        found.add((field, term))
+        return found
+
+    def score(self, grant):
+        fingerprint = grant.get('fingerprint') or content_fingerprint(grant)
+        cached = self.cache.get(fingerprint)
+        if cached is not None:
+            return cached
+        score = self.base + sum(self.weights[m] for m in self.matches(grant))
+        score = max(0, min(100, score))
+        if len(self.cache) >= self.CACHE_MAX:
+            self.cache.clear()
+        self.cache[fingerprint] = score
+        return score
+
+def load_profile(path=PROFILE_FILE):
+    """The ProfileMatcher for profile.json, or None (built-in eligibility rules) when it does not exist."""
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return ProfileMatcher(json.load(f))
+
+def load_profiles(path=PROFILES_FILE):
+    """ProfileMatchers for profiles.json (a list of profiles), or [] when it does not exist."""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        matchers = [ProfileMatcher(p) for p in json.load(f)]
+    names = [m.name for m in matchers]
+    if len(set(names)) != len(names):
+        raise ValueError("profile names must be unique")
+    return matchers
+
 # --- CLASS: SCORING ENGINE ---
 class GrantScorer:
     """
@@ -25,501 +725,2961 @@ class GrantScorer:
     - Funding Amount vs Effort
     - Deadline Urgency
     - Source Reliability
+
+    Reads the normalized fields stamped at ingest (see normalize_grant);
+    grants without them are normalized on the fly. Eligibility comes from a
+    ProfileMatcher when profile.json exists (see load_profile), otherwise from
+    the built-in startup rules.
     """
     
-    def __init__(self):
+    def __init__(self, matcher=None):
         self.weights = {
             "eligibility": 0.4,
             "funding": 0.3,
             "urgency": 0.2,
             "reliability": 0.1
         }
+        self.scored = 0  # Grants scored by this instance, for the run log
+        self.matcher = matcher if matcher is not None else load_profile()
 
-    def calculate_score(self, grant):
+    @instrumented('scorer.calculate_score')
+    def calculate_score(self, grant, now=None):
+        self.scored += 1
+        if 'deadline_kind' not in grant:
+            grant = dict(grant, **normalized_fields(grant))
         score = 0.0
         
-        # 1. Eligibility Check (Simple Keyword Matching for now)
-        # Ideally this would match against a user profile
-        eligibility_score = 100
-        if "student" in grant.get('eligibility_summary', '').lower(): 
-            eligibility_score = 50 # Assume we are a startup, not students
-        if "non-profit" in grant.get('sector_focus', '').lower():
-            eligibility_score = 60
-            
+        # 1. Eligibility Check (profile keywords, or the built-in rules)
+        if self.matcher is not None:
+            eligibility_score = self.matcher.score(grant)
+        else:
+            eligibility_score = self.eligibility_score(grant.get('eligibility_summary', ''), grant['categories'])
         score += eligibility_score * self.weights['eligibility']
         
         # 2. Funding Analysis
-        funding_str = grant.get('funding_amount', '0')
-        funding_score = 50 # Default neutral
-        if "Equity" in grant.get('funding_type', ''):
-            funding_score = 70 # High value but dilutive
-        if "Grant" in grant.get('funding_type', ''):
-            funding_score = 95 # Free money!
-        if "Credits" in grant.get('funding_type', ''):
-            funding_score = 60 # Good but restricted use
-            
+        funding_score = self.funding_score(grant['funding_kind'])
         score += funding_score * self.weights['funding']
         
         # 3. Urgency (Deadline)
-        deadline = grant.get('deadline', '')
-        urgency_score = 50
-        if deadline.lower() == 'open all year':
-            urgency_score = 80 # Good because low pressure
-        else:
-            try:
-                # Basic date parsing (assuming YYYY-MM-DD or simple standard formats)
-                deadline_date = datetime.strptime(deadline, "%Y-%m-%d")
-                days_left = (deadline_date - datetime.now()).days
-                
-                if days_left < 0: urgency_score = 0 # Expired
-                elif days_left < 7: urgency_score = 90 # ACTION NEEDED NOW
-                elif days_left < 30: urgency_score = 85
-                elif days_left > 90: urgency_score = 60 # Far away
-            except:
-                urgency_score = 50 # Unknown format
-        
+        urgency_score = self.urgency_score(grant['deadline_kind'], grant['deadline_ordinal'], now or datetime.now())
         score += urgency_score * self.weights['urgency']
         
         # 4. Source Reliability
-        source_type = grant.get('source_category', 'Unknown')
+        reliability_score = self.reliability_score(grant.get('source_category', 'Unknown'))
+        score += reliability_score * self.weights['reliability']
+        
+        return int(score)
+
+    # --- Sub-scores (shared by calculate_score and score_many) ---
+    def eligibility_score(self, eligibility_summary, categories):
+        eligibility_score = 100
+        if "student" in eligibility_summary.lower(): 
+            eligibility_score = 50 # Assume we are a startup, not students
+        if CATEGORY_NON_PROFIT in categories:
+            eligibility_score = 60
+        return eligibility_score
+
+    def funding_score(self, funding_kind):
+        if funding_kind == FUNDING_GRANT: return 95 # Free money!
+        if funding_kind == FUNDING_EQUITY: return 70 # High value but dilutive
+        if funding_kind == FUNDING_CREDITS: return 60 # Good but restricted use
+        return 50 # Default neutral
+
+    def urgency_from_days(self, days_left):
+        if days_left < 0: return 0 # Expired
+        elif days_left < 7: return 90 # ACTION NEEDED NOW
+        elif days_left < 30: return 85
+        elif days_left > 90: return 60 # Far away
+        return 50
+
+    def urgency_score(self, deadline_kind, deadline_ordinal, now):
+        if deadline_kind == DEADLINE_OPEN:
+            return 80 # Good because low pressure
+        if deadline_kind != DEADLINE_DATE:
+            return 50 # Unknown format
+        return self.urgency_from_days(deadline_ordinal - days_base(now))
+
+    def reliability_score(self, source_type):
         reliability_score = 50
         if source_type == 'Gov': reliability_score = 100
         elif source_type == 'Accelerator': reliability_score = 90
         elif source_type == 'Private': reliability_score = 80
-        
-        score += reliability_score * self.weights['reliability']
-        
-        return int(score)
+        return reliability_score
+
+    # --- Batch scoring ---
+    def extract_columns(self, grants, profile_fields=None):
+        """
+        Pulls the normalized fields the scorer needs out of a list of grants into
+        parallel columns. The built-in eligibility only depends on the grant, so
+        it is taken here, in the one pass that reads the grants anyway.
+        profile_fields (default: whether a profile is loaded) adds what
+        ProfileMatcher.score reads.
+        """
+        if profile_fields is None:
+            profile_fields = self.matcher is not None
+        columns = {"builtin_eligibility": [], "funding_kind": [],
+                   "deadline_kind": [], "deadline_ordinal": [], "source_category": [], "profile_fields": []}
+        for g in grants:
+            if 'deadline_kind' not in g:
+                g = dict(g, **normalized_fields(g))
+            columns['builtin_eligibility'].append(self.eligibility_score(g.get('eligibility_summary', ''), g['categories']))
+            columns['funding_kind'].append(g['funding_kind'])
+            columns['deadline_kind'].append(g['deadline_kind'])
+            columns['deadline_ordinal'].append(g['deadline_ordinal'])
+            columns['source_category'].append(g.get('source_category', 'Unknown'))
+            if profile_fields:
+                columns['profile_fields'].append({k: g.get(k) for k in ['fingerprint'] + list(PROFILE_FIELDS.values())})
+        return columns
+
+    @instrumented('scorer.score_many')
+    def score_many(self, grants=None, columns=None, now=None):
+        """
+        Scores a whole catalog in one pass. Accepts either a list of grants or
+        pre-extracted columns (see extract_columns). Every grant is scored
+        against the same reference "now". Uses NumPy when available.
+
+        Returns (scores, priorities), both plain lists matching calculate_score
+        and determine_priority for each grant.
+        """
+        return self.score_matrix(grants, [self.matcher], columns=columns, now=now)[0]
+
+    @instrumented('scorer.score_matrix')
+    def score_matrix(self, grants=None, matchers=None, columns=None, now=None):
+        """
+        Scores every grant against several eligibility profiles in one pass.
+        Funding, urgency and reliability are computed once per grant; only
+        eligibility is per profile. matchers holds a ProfileMatcher (or None for
+        the built-in rules) per profile. Returns [(scores, priorities)] in the
+        same order, each matching calculate_score with that matcher.
+        """
+        matchers = [self.matcher] if matchers is None else matchers
+        if columns is None:
+            columns = self.extract_columns(grants or [], any(m is not None for m in matchers))
+        self.scored += len(columns['deadline_kind'])
+        now = now or datetime.now()
+        base = days_base(now)
+
+        if np is not None:
+            return self.score_columns_np(columns, matchers, now)
+
+        reliability_cache = {}  # Source labels are free text; memoize per distinct value
+        builtin = columns['builtin_eligibility']
+        funding, deadline_days, deadline_fixed, reliability = [], [], [], []
+        for fkind, dkind, dord, source in zip(columns['funding_kind'], columns['deadline_kind'],
+                                              columns['deadline_ordinal'], columns['source_category']):
+            funding.append(self.funding_score(fkind))
+
+            # Dated deadlines go through the day thresholds; the rest have a fixed urgency
+            if dkind == DEADLINE_DATE:
+                deadline_days.append(dord - base); deadline_fixed.append(-1)
+            else:
+                deadline_days.append(0); deadline_fixed.append(80 if dkind == DEADLINE_OPEN else 50)
+
+            if source not in reliability_cache:
+                reliability_cache[source] = self.reliability_score(source)
+            reliability.append(reliability_cache[source])
+
+        eligibilities = [builtin if m is None else [m.score(fields) for fields in columns['profile_fields']]
+                         for m in matchers]
+
+        w = self.weights
+        urgency = [fixed if fixed >= 0 else self.urgency_from_days(days)
+                   for days, fixed in zip(deadline_days, deadline_fixed)]
+        results = []
+        for eligibility in eligibilities:
+            scores, priorities = [], []
+            for e, f, u, r in zip(eligibility, funding, urgency, reliability):
+                score = 0.0
+                score += e * w['eligibility']
+                score += f * w['funding']
+                score += u * w['urgency']
+                score += r * w['reliability']
+                score = int(score)
+                scores.append(score)
+                priorities.append(self.determine_priority(score))
+            results.append((scores, priorities))
+        return results
+
+    @staticmethod
+    def lookup(values, score_fn):
+        """float64 array of score_fn(v) for each value, calling score_fn once per distinct value."""
+        memo = {v: score_fn(v) for v in set(values)}
+        return np.fromiter(map(memo.__getitem__, values), dtype=np.float64, count=len(values))
+
+    def score_columns_np(self, columns, matchers, now):
+        """
+        score_matrix with NumPy: the categorical columns (funding kind, deadline
+        kind, source) become score arrays through one sub-score call per
+        distinct value, then the urgency thresholds and the weighted sum run
+        over whole arrays.
+        """
+        n = len(columns['deadline_kind'])
+        builtin = np.fromiter(columns['builtin_eligibility'], dtype=np.float64, count=n)
+        funding = self.lookup(columns['funding_kind'], self.funding_score)
+        reliability = self.lookup(columns['source_category'], self.reliability_score)
+        # Urgency of undated kinds is fixed; -1 marks a date, which goes through the day thresholds
+        fixed = self.lookup(columns['deadline_kind'],
+                            lambda k: -1.0 if k == DEADLINE_DATE else self.urgency_score(k, None, now))
+        days = np.array(columns['deadline_ordinal'], dtype=np.float64) - days_base(now)  # None -> nan
+        urgency = np.select(
+            [fixed >= 0, days < 0, days < 7, days < 30, days > 90],
+            [fixed, 0.0, 90.0, 85.0, 60.0],
+            default=50.0,
+        )
+
+        w = self.weights
+        funding_part = funding * w['funding']
+        urgency_part = urgency * w['urgency']
+        reliability_part = reliability * w['reliability']
+        results = []
+        for m in matchers:
+            eligibility = builtin if m is None else np.fromiter(
+                map(m.score, columns['profile_fields']), dtype=np.float64, count=n)
+            # Same accumulation order as calculate_score so float results are identical
+            total = np.zeros(n, dtype=np.float64)
+            total = total + eligibility * w['eligibility']
+            total = total + funding_part
+            total = total + urgency_part
+            total = total + reliability_part
+            scores_arr = total.astype(np.int64)
+            priorities = np.where(scores_arr >= 90, "HIGH", np.where(scores_arr >= 75, "MEDIUM", "LOW"))
+            results.append((scores_arr.tolist(), priorities.tolist()))
+        return results
 
     def determine_priority(self, score):
         if score >= 90: return "HIGH"
         if score >= 75: return "MEDIUM"
         return "LOW"
 
+# --- CLASS: ALERT OUTBOX ---
+class AlertOutbox:
+    """
+    Persistent queue of webhook alerts (ALERT_OUTBOX_FILE). Each alert has an
+    idempotency key (grant id + alert type + date); a key that is already
+    queued or was delivered in the last ALERT_KEY_RETENTION_DAYS is ignored,
+    so re-runs never send the same alert twice. Thread-safe.
+
+    Changes only mark the outbox dirty; save() writes it (whole) when dirty,
+    so callers persist once per batch of alerts or deliveries, not per alert.
+    """
+    def __init__(self, path=ALERT_OUTBOX_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.pending = {}  # key -> {payload, attempts, next_attempt, created}
+        self.sent = {}     # key -> date delivered
+        self.failed = {}   # key -> record, after ALERT_MAX_ATTEMPTS
+        self.dirty = False
+        self.saved_at = 0.0
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self.pending = state.get('pending', {})
+                self.sent = state.get('sent', {})
+                self.failed = state.get('failed', {})
+            except (ValueError, OSError) as e:
+                print(f"⚠️ Alert outbox unreadable, starting empty: {e}")
+        cutoff = (datetime.now() - timedelta(days=ALERT_KEY_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        self.sent = {k: d for k, d in self.sent.items() if d >= cutoff}
+
+    def save(self, min_interval=0):
+        """Writes the outbox if it changed, unless the last write was less than min_interval seconds ago."""
+        with self.lock:
+            if not self.dirty or time.time() - self.saved_at < min_interval:
+                return False
+            state = {"pending": self.pending, "sent": self.sent, "failed": self.failed}
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory): os.makedirs(directory)
+            atomic_write_text(self.path, json.dumps(state, indent=2))
+            self.dirty = False
+            self.saved_at = time.time()
+            return True
+
+    def enqueue(self, key, payload):
+        """Returns False if the key was already queued, sent or given up on."""
+        with self.lock:
+            if key in self.pending or key in self.sent or key in self.failed:
+                return False
+            self.pending[key] = {"payload": payload, "attempts": 0, "next_attempt": 0, "created": time.time()}
+            self.dirty = True
+        return True
+
+    def take_due(self, limit, in_flight):
+        """Returns up to `limit` due alerts that are not already being delivered."""
+        now = time.time()
+        with self.lock:
+            keys = [k for k, r in self.pending.items() if r['next_attempt'] <= now and k not in in_flight]
+            return [(k, self.pending[k]) for k in keys[:limit]]
+
+    def next_due(self, in_flight):
+        with self.lock:
+            times = [r['next_attempt'] for k, r in self.pending.items() if k not in in_flight]
+            return min(times) if times else None
+
+    def mark_sent(self, keys):
+        with self.lock:
+            today = datetime.now().strftime("%Y-%m-%d")
+            for k in keys:
+                self.pending.pop(k, None)
+                self.sent[k] = today
+            self.dirty = True
+
+    def mark_failed(self, keys, retry):
+        """Schedules a retry with exponential backoff, or gives up after ALERT_MAX_ATTEMPTS."""
+        with self.lock:
+            for k in keys:
+                record = self.pending.get(k)
+                if record is None: continue
+                record['attempts'] += 1
+                if not retry or record['attempts'] >= ALERT_MAX_ATTEMPTS:
+                    self.failed[k] = self.pending.pop(k)
+                else:
+                    delay = min(ALERT_RETRY_BASE * 2 ** (record['attempts'] - 1), ALERT_RETRY_MAX)
+                    record['next_attempt'] = time.time() + delay
+            self.dirty = True
+
+class WebhookDeliveryError(Exception):
+    def __init__(self, message, retry=True):
+        super().__init__(message)
+        self.retry = retry
+
 # --- CLASS: ALERT MANAGER ---
 class AlertManager:
-    def __init__(self):
+    """
+    Alerts are queued in an AlertOutbox and delivered by a small pool of
+    background threads. Each thread keeps one keep-alive connection to the
+    webhook host and can send ALERT_BATCH_SIZE alerts per request. Failures
+    are retried with exponential backoff, and flush() waits for the queue at
+    the end of a run. Delivery counts and latency are kept in self.metrics.
+    """
+    def __init__(self, webhook_url=None, outbox_file=ALERT_OUTBOX_FILE):
         self.alerts_sent = 0
+        self.webhook_url = webhook_url or WEBHOOK_URL
+        self.outbox = AlertOutbox(outbox_file) if self.webhook_url else None
+        self.metrics = {"queued": 0, "deduped": 0, "sent": 0, "failed": 0, "retries": 0,
+                        "requests": 0, "latency_ms_total": 0.0, "latency_ms_max": 0.0}
+        self.metrics_lock = threading.Lock()
+        self.workers = []
+        self.in_flight = set()
+        self.wake = threading.Condition()
+        self.stopping = False
 
-    def send_webhook(self, payload):
-        if not WEBHOOK_URL:
+    @instrumented('alerts.send_webhook')
+    def send_webhook(self, payload, key=None):
+        """Queues an alert for background delivery. key is the idempotency key (random if omitted)."""
+        if not self.webhook_url:
             # print(f"⚠️ [MOCK ALERT] Webhook not set. Payload: {json.dumps(payload)}")
             return
-        
+        key = key or hashlib.sha1(f"{time.time()}|{random.random()}".encode()).hexdigest()
+        if self.outbox.enqueue(key, payload):
+            self.count("queued")
+            self.start()
+            with self.wake:
+                self.wake.notify_all()
+        else:
+            self.count("deduped")
+
+    def alert_key(self, grant, alert_type):
+        return f"{grant.get('id') or grant.get('program_name')}|{alert_type}|{datetime.now().strftime('%Y-%m-%d')}"
+
+    def count(self, name, amount=1):
+        with self.metrics_lock:
+            self.metrics[name] += amount
+
+    def metrics_since(self, before):
+        """What was counted since `before` (an earlier copy of self.metrics), e.g. for one scan cycle."""
+        with self.metrics_lock:
+            now = dict(self.metrics)
+        delta = {k: round(v - before.get(k, 0), 3) for k, v in now.items() if k != 'latency_ms_max'}
+        if now['latency_ms_max'] > before.get('latency_ms_max', 0):
+            delta['latency_ms_max'] = now['latency_ms_max']  # A new high, so reached in this window
+        return delta
+
+    def save(self):
+        """Persists newly queued alerts; called once per batch (see GrantManager.save_grants, alert_deadlines)."""
+        if self.outbox:
+            self.outbox.save()
+
+    # --- Delivery ---
+    def start(self):
+        self.workers = [t for t in self.workers if t.is_alive()]
+        while len(self.workers) < ALERT_WORKERS:
+            t = threading.Thread(target=self.worker_loop, name=f"alert-worker-{len(self.workers)}", daemon=True)
+            self.workers.append(t)
+            t.start()
+
+    @instrumented('alerts.flush')
+    def flush(self, timeout=ALERT_FLUSH_TIMEOUT):
+        """
+        Waits until every due alert is delivered or given up on (at most
+        `timeout` seconds), then stops the workers and persists the outbox.
+        Alerts still backing off stay queued for the next run.
+        """
+        if not self.outbox:
+            return
+        self.start()
+        deadline = time.time() + timeout
+        with self.wake:
+            self.stopping = True
+            self.wake.notify_all()
+        for t in self.workers:
+            t.join(max(0, deadline - time.time()))
+        self.workers = [t for t in self.workers if t.is_alive()]
+        if not self.workers:
+            self.stopping = False
+        self.outbox.save()
+
+    def worker_loop(self):
+        conn = None
         try:
-            req = urllib.request.Request(
-                WEBHOOK_URL, 
-                data=json.dumps(payload).encode('utf-8'),
-                headers={'Content-Type': 'application/json'}
-            )
-            urllib.request.urlopen(req)
-            print("🚀 Alert sent successfully!")
-        except Exception as e:
-            print(f"❌ Failed to send alert: {e}")
+            while True:
+                with self.wake:
+                    if ALERT_BATCH_SIZE > 1 and not self.stopping:
+                        # Give the scan a moment to queue more alerts so they share a request
+                        if 0 < len(self.outbox.take_due(ALERT_BATCH_SIZE, self.in_flight)) < ALERT_BATCH_SIZE:
+                            self.wake.wait(ALERT_BATCH_LINGER)
+                    batch = self.outbox.take_due(ALERT_BATCH_SIZE, self.in_flight)
+                    if not batch:
+                        next_due = self.outbox.next_due(self.in_flight)
+                        if self.stopping and (next_due is None or next_due - time.time() > ALERT_FLUSH_TIMEOUT):
+                            return
+                        wait = 1.0 if next_due is None else max(0.05, min(1.0, next_due - time.time()))
+                        self.wake.wait(wait)
+                        continue
+                    keys = [k for k, _ in batch]
+                    self.in_flight.update(keys)
+                try:
+                    payloads = [r['payload'] for _, r in batch]
+                    body = payloads[0] if ALERT_BATCH_SIZE == 1 else {"alerts": payloads}
+                    conn = self.deliver(conn, body)
+                    self.outbox.mark_sent(keys)
+                    self.count("sent", len(keys))
+                    print("🚀 Alert sent successfully!" if len(keys) == 1 else f"🚀 {len(keys)} alerts sent successfully!")
+                except WebhookDeliveryError as e:
+                    if conn is not None:
+                        conn.close()
+                        conn = None
+                    retried = e.retry and all(r['attempts'] + 1 < ALERT_MAX_ATTEMPTS for _, r in batch)
+                    self.outbox.mark_failed(keys, e.retry)
+                    self.count("retries" if retried else "failed", len(keys))
+                    print(f"❌ Failed to send alert: {e}" + (" (will retry)" if retried else ""))
+                finally:
+                    with self.wake:
+                        self.in_flight.difference_update(keys)
+                # Persist deliveries so a crash doesn't resend them; throttled, flush() writes the rest
+                self.outbox.save(min_interval=ALERT_SAVE_INTERVAL)
+        finally:
+            if conn is not None: conn.close()
 
+    @instrumented('alerts.deliver')
+    def deliver(self, conn, payload):
+        """POSTs one payload over a reused keep-alive connection. Returns the connection for the next request."""
+        url = urllib.parse.urlsplit(self.webhook_url)
+        if conn is None:
+            conn_cls = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+            conn = conn_cls(url.netloc, timeout=ALERT_TIMEOUT)
+        path = url.path or '/'
+        if url.query: path += '?' + url.query
+        started = time.perf_counter()
+        try:
+            conn.request('POST', path, body=json.dumps(payload).encode('utf-8'),
+                         headers={'Content-Type': 'application/json', 'User-Agent': USER_AGENT})
+            resp = conn.getresponse()
+            resp.read()  # Drain so the connection can be reused
+        except (OSError, http.client.HTTPException) as e:
+            conn.close()
+            raise WebhookDeliveryError(f"{type(e).__name__}: {e}")
+        latency = (time.perf_counter() - started) * 1000
+        with self.metrics_lock:
+            self.metrics['requests'] += 1
+            self.metrics['latency_ms_total'] += latency
+            self.metrics['latency_ms_max'] = max(self.metrics['latency_ms_max'], latency)
+        if resp.status >= 400:
+            # Client errors won't fix themselves, except rate limiting
+            raise WebhookDeliveryError(f"HTTP {resp.status}", retry=resp.status >= 500 or resp.status == 429)
+        return conn
+
+    @instrumented('alerts.check_new_grant')
     def check_new_grant(self, grant):
         """Checks if a newly added grant allows for an alert."""
         if grant.get('relevance_score', 0) > 85:
             message = {
                 "program_name": grant['program_name'],
-                "funding_amount": grant['funding_amount'],
-                "country": grant['country'],
-                "deadline": grant['deadline'],
+                # Feed sources may omit fields the simulation always had
+                "funding_amount": grant.get('funding_amount', 'Unknown'),
+                "country": grant.get('country', 'Unknown'),
+                "deadline": grant.get('deadline', 'Unknown'),
                 "relevance_score": grant['relevance_score'],
-                "application_link": grant['application_link'],
+                "application_link": grant.get('application_link', ''),
                 "summary": f"🏆 New High Score Grant: {grant['program_name']} ({grant['relevance_score']})"
             }
             print(f"\n🔔 TRYING ALERT: Score {grant['relevance_score']} > 85")
-            self.send_webhook(message)
+            self.send_webhook(message, key=self.alert_key(grant, "new_high_score"))
             self.alerts_sent += 1
 
+    @instrumented('alerts.check_deadlines')
     def check_deadlines(self, grants):
-        """Checks for grants expiring soon (7 days or 3 days)."""
-        today = datetime.now()
+        """Checks for grants expiring soon (ALERT_DEADLINE_DAYS) by scanning a list of grants."""
+        base = days_base(datetime.now())
+        due = []
         for grant in grants:
-            if grant.get('status') in ['Applied', 'Rejected', 'Awarded']:
+            if grant.get('status') in CLOSED_STATUSES:
                 continue # Skip closed items
-                
-            deadline = grant.get('deadline', '')
-            if deadline.lower() == 'open all year': continue
-            
-            try:
-                d_date = datetime.strptime(deadline, "%Y-%m-%d")
-                days_left = (d_date - today).days
-                
-                # Alert on exactly 7 days or 3 days left
-                if days_left in [7, 3]:
-                    message = {
-                        "text": (
-                            f"⏳ *DEADLINE ALERT: {days_left} Days Left*\n\n"
-                            f"📌 {grant['program_name']}\n"
-                            f"⚠️ Act fast!"
-                        )
-                    }
-                    self.send_webhook(message)
-                    print(f"⏰ Deadline Alert sent for {grant['program_name']}")
-            except:
-                pass
+
+            if 'deadline_kind' not in grant:
+                normalize_grant(grant)
+            if grant['deadline_kind'] != DEADLINE_DATE: continue
+            days_left = grant['deadline_ordinal'] - base
+            if days_left in ALERT_DEADLINE_DAYS:
+                due.append((days_left, grant))
+        self.alert_deadlines(due)
+
+    @instrumented('alerts.alert_deadlines')
+    def alert_deadlines(self, due):
+        """Sends one deadline alert per (days_left, grant) pair."""
+        for days_left, grant in due:
+            message = {
+                "text": (
+                    f"⏳ *DEADLINE ALERT: {days_left} Days Left*\n\n"
+                    f"📌 {grant['program_name']}\n"
+                    f"⚠️ Act fast!"
+                )
+            }
+            self.send_webhook(message, key=self.alert_key(grant, f"deadline_{days_left}"))
+            print(f"⏰ Deadline Alert queued for {grant['program_name']}")
+        self.save()
+
+# --- CLASS: DEADLINE INDEX ---
+class DeadlineIndex:
+    """
+    Open grants with a dated deadline, kept sorted by deadline ordinal so
+    "due in exactly k days", "expiring this week" and "expired" are bisect
+    range lookups instead of catalog scans. Grants with a closed status
+    (CLOSED_STATUSES) or no dated deadline are not indexed.
+    """
+    def __init__(self):
+        self.entries = []    # sorted (deadline_ordinal, id)
+        self.ordinals = {}   # id -> indexed ordinal, to find an entry when it changes
+
+    def rebuild(self, grants):
+        self.ordinals = {}
+        for g in grants:
+            if self.indexable(g):
+                self.ordinals[g['id']] = g['deadline_ordinal']
+        self.entries = sorted((o, gid) for gid, o in self.ordinals.items())
+
+    def indexable(self, grant):
+        return grant.get('deadline_kind') == DEADLINE_DATE and grant.get('status') not in CLOSED_STATUSES
+
+    def update(self, grant):
+        """Re-indexes one grant after it was added or changed."""
+        gid = grant['id']
+        old = self.ordinals.pop(gid, None)
+        if old is not None:
+            i = bisect.bisect_left(self.entries, (old, gid))
+            if i < len(self.entries) and self.entries[i] == (old, gid):
+                del self.entries[i]
+        if self.indexable(grant):
+            self.ordinals[gid] = grant['deadline_ordinal']
+            bisect.insort(self.entries, (grant['deadline_ordinal'], gid))
+
+    def between(self, lo_days, hi_days, now=None):
+        """Ids with lo_days <= days_left < hi_days, soonest first (None means unbounded)."""
+        base = days_base(now or datetime.now())
+        lo = 0 if lo_days is None else bisect.bisect_left(self.entries, (base + lo_days,))
+        hi = len(self.entries) if hi_days is None else bisect.bisect_left(self.entries, (base + hi_days,))
+        return [gid for _, gid in self.entries[lo:hi]]
+
+    def due_in(self, days, now=None):
+        return self.between(days, days + 1, now)
+
+    def expiring_within(self, days=7, now=None):
+        return self.between(0, days, now)
+
+    def expired(self, now=None):
+        return self.between(None, 0, now)
+
+    def __len__(self):
+        return len(self.entries)
+
+# --- CLASS: NEAR-DUPLICATE INDEX ---
+NEAR_DUP_WORD_RE = re.compile(r'[a-z0-9]+')
+NEAR_DUP_YEAR_RE = re.compile(r'^(19|20)\d\d$')  # "Fund 2025" and "Fund 2026" are the same program
+_MINHASH_PRIME = (1 << 31) - 1
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures + LSH banding over name, provider, link and summary
+    shingles. Catches re-listings the md5(name|provider) id misses ("AI Grant"
+    vs "AI Grant 2026", a new URL or a reworded summary, as long as the other
+    one still agrees). A lookup only compares grants that share at least one
+    band bucket, so it stays sub-linear in the catalog size; candidates are
+    then ranked by estimated Jaccard similarity.
+    """
+    SUMMARY_AGREEMENT = 0.5  # Summary word-pair Jaccard at which two summaries describe the same program
+    BATCH_SHINGLES = 16384   # Shingles hashed per numpy call in signature_batch (x num_perm int64s of memory)
+    def __init__(self, num_perm=NEAR_DUP_PERMUTATIONS, bands=NEAR_DUP_BANDS, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        rng = random.Random(seed)  # Fixed seed: signatures are stable across runs
+        self.perms = [(rng.randrange(1, _MINHASH_PRIME), rng.randrange(0, _MINHASH_PRIME)) for _ in range(num_perm)]
+        if np is not None:
+            self.perm_a = np.array([a for a, _ in self.perms], dtype=np.int64)[:, None]
+            self.perm_b = np.array([b for _, b in self.perms], dtype=np.int64)[:, None]
+        self.buckets = [{} for _ in range(bands)]  # band -> {band key: set of ids}
+        self.signatures = {}  # id -> signature, to unindex a grant when it changes
+
+    @staticmethod
+    def summary_pairs(grant):
+        words = NEAR_DUP_WORD_RE.findall(str(grant.get('eligibility_summary') or '').lower())
+        return {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+    @staticmethod
+    def link_parts(grant):
+        """(host without www., path tokens) of the application link."""
+        link = urllib.parse.urlsplit(str(grant.get('application_link') or '').lower())
+        host = link.netloc[4:] if link.netloc.startswith('www.') else link.netloc
+        return host, NEAR_DUP_WORD_RE.findall(link.path)
+
+    def shingles(self, grant):
+        """
+        Character 3-grams of the name, provider words (years dropped from both),
+        word pairs of the summary, link host + path tokens. The provider counts
+        per word: as 3-grams a long provider name outweighed everything else, so
+        two programs of one provider looked like the same listing.
+        """
+        out = set()
+        words = NEAR_DUP_WORD_RE.findall(str(grant.get('program_name') or '').lower())
+        text = ' '.join(w for w in words if not NEAR_DUP_YEAR_RE.match(w))
+        if text:
+            out.update(f"p:{text[i:i + 3]}" for i in range(max(1, len(text) - 2)))
+        words = NEAR_DUP_WORD_RE.findall(str(grant.get('provider') or '').lower())
+        out.update(f"o:{w}" for w in words if not NEAR_DUP_YEAR_RE.match(w))
+        out.update(f"s:{pair}" for pair in self.summary_pairs(grant))
+        host, path = self.link_parts(grant)
+        out.update(f"l:{host}/{tok}" for tok in path)
+        if host: out.add(f"l:{host}")
+        return out
+
+    def hashes(self, grant):
+        return [zlib.crc32(s.encode('utf-8')) % _MINHASH_PRIME for s in self.shingles(grant)]
+
+    def signature(self, grant):
+        hashes = self.hashes(grant)
+        if not hashes:
+            return None
+        if np is not None:
+            x = np.array(hashes, dtype=np.int64)[None, :]
+            return tuple(((self.perm_a * x + self.perm_b) % _MINHASH_PRIME).min(axis=1).tolist())
+        return tuple(min((a * x + b) % _MINHASH_PRIME for x in hashes) for a, b in self.perms)
+
+    def signature_batch(self, grants):
+        """[signature(g) for g in grants], with one numpy call per BATCH_SHINGLES shingles instead of one per grant."""
+        if np is None:
+            return [self.signature(g) for g in grants]
+        out = []
+        hashes, starts = [], []
+        for i, g in enumerate(grants):
+            h = self.hashes(g)
+            starts.append(len(hashes) if h else None)
+            hashes.extend(h)
+            if len(hashes) >= self.BATCH_SHINGLES or i == len(grants) - 1:
+                out.extend(self.min_hashes(hashes, starts))
+                hashes, starts = [], []
+        return out
+
+    def min_hashes(self, hashes, starts):
+        """Signatures for consecutive runs of `hashes` beginning at `starts` (None: a grant without shingles)."""
+        if not hashes:
+            return [None] * len(starts)
+        x = np.array(hashes, dtype=np.int64)[None, :]
+        offsets = [s for s in starts if s is not None]
+        mins = np.minimum.reduceat((self.perm_a * x + self.perm_b) % _MINHASH_PRIME, offsets, axis=1).T.tolist()
+        rows = iter(mins)
+        return [None if s is None else tuple(next(rows)) for s in starts]
+
+    def same_listing(self, a, b):
+        """
+        True if two similar grants also share their link or most of their summary.
+        Name and provider alone can't tell a re-listing from another program of the
+        same provider ("Launchpad Accelerator 12" vs "Launchpad Accelerator 13").
+        """
+        host_a, path_a = self.link_parts(a)
+        if host_a and (host_a, path_a) == self.link_parts(b):
+            return True
+        pairs_a, pairs_b = self.summary_pairs(a), self.summary_pairs(b)
+        if not (pairs_a and pairs_b):
+            # Nothing to compare a link against: the name/provider similarity is all there is
+            return not (host_a and self.link_parts(b)[0])
+        return len(pairs_a & pairs_b) / len(pairs_a | pairs_b) >= self.SUMMARY_AGREEMENT
+
+    def band_keys(self, sig):
+        return [sig[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+    def add(self, grant, sig=None):
+        """(Re-)indexes one grant after it was added or changed."""
+        self.remove(grant['id'])
+        sig = sig or self.signature(grant)
+        if sig is None:
+            return
+        self.signatures[grant['id']] = sig
+        for bucket, key in zip(self.buckets, self.band_keys(sig)):
+            bucket.setdefault(key, set()).add(grant['id'])
+
+    def remove(self, gid):
+        sig = self.signatures.pop(gid, None)
+        if sig is None:
+            return
+        for bucket, key in zip(self.buckets, self.band_keys(sig)):
+            ids = bucket.get(key)
+            if ids is not None:
+                ids.discard(gid)
+                if not ids: del bucket[key]
+
+    def similarity(self, sig_a, sig_b):
+        return sum(map(int.__eq__, sig_a, sig_b)) / self.num_perm
+
+    def query(self, grant, threshold=NEAR_DUP_THRESHOLD, sig=None, catalog=None):
+        """
+        [(similarity, id)] of indexed grants at or above threshold, most similar
+        first. With catalog (id -> grant) only those that are also same_listing.
+        """
+        sig = sig or self.signature(grant)
+        if sig is None:
+            return []
+        shared = {}  # candidate id -> bands in common
+        for bucket, key in zip(self.buckets, self.band_keys(sig)):
+            for gid in bucket.get(key, ()):
+                shared[gid] = shared.get(gid, 0) + 1
+        shared.pop(grant.get('id'), None)
+        # A pair at the threshold shares bands * threshold**rows bands on average (~6.5 of 16 at 0.8);
+        # one shared band is almost always a chance collision, so skip the exact comparison for those.
+        min_shared = 2 if self.bands * threshold ** self.rows >= 4 else 1
+        matches = [(round(self.similarity(sig, self.signatures[gid]), 3), gid)
+                   for gid, n in shared.items() if n >= min_shared]
+        matches = [m for m in matches if m[0] >= threshold]
+        if catalog is not None:
+            matches = [m for m in matches if self.same_listing(grant, catalog[m[1]])]
+        return sorted(matches, key=lambda m: (-m[0], m[1]))
+
+    def __len__(self):
+        return len(self.signatures)
+
+# --- CLASS: DASHBOARD EXPORT ---
+class DashboardExporter:
+    """
+    Writes a lazily-loadable copy of the catalog for index.html next to grants.js:
+    - data/grants-<shard>.js: compact (non-indented) shards by priority or deadline month,
+      each with a precompressed .gz copy for servers that support gzip_static.
+    - data/manifest.js: counts, shard list (with content hashes) and the id order
+      pre-sorted by relevance, so the dashboard renders the first shard without sorting.
+    - data/index.js: facet lists (category, status, priority) and a token inverted
+      index for search, as positions into the manifest order, plus the header stats,
+      so filters become set intersections. The dashboard fetches it on first search,
+      and only uses it if its order_hash matches the manifest it has.
+    Files whose content did not change (shards, index, manifest) are not rewritten.
+    """
+    PRIORITY_SHARDS = ['HIGH', 'MEDIUM', 'LOW']
+
+    def __init__(self, out_dir=EXPORT_DIR, shard_by=EXPORT_SHARD_BY):
+        self.out_dir = out_dir
+        self.shard_by = shard_by
+        self.bytes_written = 0
+
+    def shard_key(self, grant):
+        if self.shard_by == 'deadline':
+            if grant.get('deadline_kind') == DEADLINE_DATE:
+                return datetime.fromordinal(grant['deadline_ordinal']).strftime('%Y-%m')
+            return 'rolling' if grant.get('deadline_kind') in (DEADLINE_OPEN, DEADLINE_ROLLING) else 'unknown'
+        return grant.get('priority', 'LOW').lower()
+
+    def shard_order(self, keys):
+        if self.shard_by == 'deadline':
+            # Months chronologically, undated buckets last
+            return sorted(keys, key=lambda k: (not k[0].isdigit(), k))
+        known = [p.lower() for p in self.PRIORITY_SHARDS]
+        return [k for k in known if k in keys] + sorted(k for k in keys if k not in known)
+
+    @instrumented('export.dashboard')
+    def export(self, grants, catalog=None):
+        """
+        Writes shards, index and manifest. Returns the number of shard files
+        (re)written. catalog is the catalog fingerprint the export is of.
+        """
+        if not os.path.exists(self.out_dir): os.makedirs(self.out_dir)
+
+        # Stable sort matches the dashboard's previous in-browser sort
+        ranked = sorted(grants, key=lambda g: -g.get('relevance_score', 0))
+        shards = {}
+        for g in ranked:
+            shards.setdefault(self.shard_key(g), []).append(g)
+
+        previous = self.read_manifest()
+        old_hashes = {sh['name']: sh['hash'] for sh in previous.get('shards', [])}
+        written = 0
+        shard_meta = []
+        for name in self.shard_order(shards):
+            body = json.dumps(shards[name], separators=(',', ':'), ensure_ascii=False, default=grant_json)
+            text = (f"window.grantsShards=window.grantsShards||{{}};"
+                    f"window.grantsShards[{json.dumps(name)}]={body};")
+            data = text.encode('utf-8')
+            digest = hashlib.sha1(data).hexdigest()[:12]
+            filename = f'grants-{name}.js'
+            path = os.path.join(self.out_dir, filename)
+            if old_hashes.get(name) != digest or not os.path.exists(path):
+                self.write_file(path, data)
+                written += 1
+            shard_meta.append({"name": name, "file": f"{self.out_dir}/{filename}",
+                               "count": len(shards[name]), "hash": digest})
+
+        order = [g['id'] for g in ranked]
+        # Index positions only mean something against this order; the dashboard checks it matches its manifest
+        order_hash = hashlib.sha1('\n'.join(order).encode('utf-8')).hexdigest()[:12]
+        index = self.build_index(ranked)
+        index["order_hash"] = order_hash
+        index_data = f"window.grantsIndex={json.dumps(index, separators=(',', ':'), ensure_ascii=False)};".encode('utf-8')
+        index_hash = hashlib.sha1(index_data).hexdigest()[:12]
+        index_path = os.path.join(self.out_dir, 'index.js')
+        if previous.get('index_hash') != index_hash or not os.path.exists(index_path):
+            self.write_file(index_path, index_data)
+
+        manifest = {
+            "version": 1,
+            "shard_by": self.shard_by,
+            "counts": {
+                "total": len(grants),
+                "high_value": sum(1 for g in grants if g.get('relevance_score', 0) > 85),
+                "applied": sum(1 for g in grants if g.get('status') == 'Applied'),
+            },
+            "shards": shard_meta,
+            "index_hash": index_hash,
+            "catalog": catalog,
+            "order_hash": order_hash,
+            "order": order,
+        }
+        # "generated" is left out of the hash, so it marks the last content change
+        manifest["hash"] = hashlib.sha1(json.dumps(manifest, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+        manifest_path = os.path.join(self.out_dir, 'manifest.js')
+        if previous.get('hash') != manifest["hash"] or not os.path.exists(manifest_path):
+            manifest["generated"] = datetime.now().isoformat(timespec='seconds')
+            text = f"window.grantsManifest={json.dumps(manifest, separators=(',', ':'), ensure_ascii=False)};"
+            self.write_file(manifest_path, text.encode('utf-8'))
+
+        self.remove_stale_shards({sh['name'] for sh in shard_meta})
+        return written
+
+    def build_index(self, grants):
+        """
+        Facet -> positions maps, search tokens -> positions, and header stats.
+        Positions index into `grants` (the manifest's "order"), ascending; a few
+        digits each instead of a 32-char id keeps the index small.
+        """
+        categories, statuses, priorities, tokens = {}, {}, {}, {}
+        added_by_date = {}
+        high_value = 0
+        for pos, g in enumerate(grants):
+            for c in g.get('categories', []):
+                categories.setdefault(c, []).append(pos)
+            statuses.setdefault(g.get('status') or 'Not Applied', []).append(pos)
+            priorities.setdefault(g.get('priority', 'LOW'), []).append(pos)
+
+            text = f"{g.get('program_name', '')} {g.get('provider', '')} {g.get('eligibility_summary', '')}"
+            for token in set(SEARCH_TOKEN_RE.findall(text.lower())):
+                tokens.setdefault(token, []).append(pos)
+
+            if g.get('relevance_score', 0) > 85: high_value += 1
+            if g.get('added_date'):
+                added_by_date[g['added_date']] = added_by_date.get(g['added_date'], 0) + 1
+
+        return {
+            "version": 2,
+            "category": categories,
+            "status": statuses,
+            "priority": priorities,
+            "tokens": tokens,
+            "stats": {
+                "total": len(grants),
+                "high_value": high_value,
+                "applied": len(statuses.get('Applied', [])),
+                # Dashboard sums the last 7 days itself, so "new this week" never goes stale
+                "added_by_date": added_by_date,
+            },
+        }
+
+    def write_file(self, path, data):
+        """Writes `data` and its precompressed .gz copy."""
+        self.bytes_written += atomic_write_bytes(path, data)
+        self.bytes_written += atomic_write_bytes(
+            path + '.gz', gzip.compress(data, compresslevel=EXPORT_GZIP_LEVEL, mtime=0))
+
+    def exported_catalog(self):
+        """The catalog fingerprint of the current export (None if there is none)."""
+        return self.read_manifest().get('catalog')
+
+    def read_manifest(self):
+        path = os.path.join(self.out_dir, 'manifest.js')
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        try:
+            return json.loads(text[len('window.grantsManifest='):].rstrip().rstrip(';'))
+        except json.JSONDecodeError:
+            return {}  # Regenerate everything
+
+    def remove_stale_shards(self, live):
+        for filename in os.listdir(self.out_dir):
+            m = re.match(r'grants-(.+)\.js(\.gz)?$', filename)
+            if m and m.group(1) not in live:
+                os.remove(os.path.join(self.out_dir, filename))
+
+# --- CLASS: PROFILE RANKER ---
+class ProfileRanker:
+    """
+    Ranks the catalog for every profile in profiles.json with one scoring pass
+    (GrantScorer.score_matrix), keeping a bounded top-K heap per profile, so a
+    run costs one catalog pass plus grants x profiles eligibility lookups
+    instead of one full run per profile. Writes data/ranking-<profile>.js for
+    each profile and queues one alert per profile for each ranked grant that
+    scores above the profile's alert_score.
+    """
+    def __init__(self, matchers, scorer=None, out_dir=EXPORT_DIR):
+        self.matchers = matchers
+        self.scorer = scorer or GrantScorer()
+        self.out_dir = out_dir
+        self.bytes_written = 0
+
+    def slug(self, name):
+        return re.sub(r'[^a-z0-9]+', '-', name.lower()).strip('-') or 'profile'
+
+    @instrumented('ranker.rank')
+    def rank(self, grants, now=None):
+        """{profile name: [(score, priority, grant)]}, best first. Closed and expired grants are not ranked."""
+        now = now or datetime.now()
+        base = days_base(now)
+        open_grants = [g for g in grants if g.get('status') not in CLOSED_STATUSES
+                       and not (g.get('deadline_kind') == DEADLINE_DATE and g['deadline_ordinal'] < base)]
+        rankings = {}
+        matrix = self.scorer.score_matrix(open_grants, self.matchers, now=now)
+        for matcher, (scores, priorities) in zip(self.matchers, matrix):
+            heap = []  # min-heap of (score, -position): ties go to the grant listed first
+            for i, score in enumerate(scores):
+                if len(heap) < matcher.top_k:
+                    heapq.heappush(heap, (score, -i))
+                elif (score, -i) > heap[0]:
+                    heapq.heapreplace(heap, (score, -i))
+            rankings[matcher.name] = [(score, priorities[-neg_i], open_grants[-neg_i])
+                                      for score, neg_i in sorted(heap, reverse=True)]
+        return rankings
+
+    @instrumented('ranker.export')
+    def export(self, rankings):
+        """Writes data/ranking-<profile>.js per profile (unchanged files are left alone). Returns files written."""
+        if not os.path.exists(self.out_dir): os.makedirs(self.out_dir)
+        written = 0
+        live = set()
+        for name, ranked in rankings.items():
+            filename = f"ranking-{self.slug(name)}.js"
+            live.add(filename)
+            payload = {"profile": name, "grants": [
+                {"rank": rank, "id": g['id'], "program_name": g['program_name'], "score": score,
+                 "priority": priority, "deadline": g.get('deadline')}
+                for rank, (score, priority, g) in enumerate(ranked, 1)]}
+            data = (f"window.grantsRankings = window.grantsRankings || {{}};\n"
+                    f"window.grantsRankings[{json.dumps(name)}] = {json.dumps(payload, separators=(',', ':'))};\n").encode('utf-8')
+            path = os.path.join(self.out_dir, filename)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    if f.read() == data:
+                        continue
+            self.bytes_written += atomic_write_bytes(path, data)
+            written += 1
+        for filename in os.listdir(self.out_dir):
+            if filename.startswith('ranking-') and filename.endswith('.js') and filename not in live:
+                os.remove(os.path.join(self.out_dir, filename))
+        return written
+
+    @instrumented('ranker.alerts')
+    def alert(self, rankings, alerter):
+        """Queues per-profile alerts. Returns the decisions as [(profile, grant id, score)]."""
+        thresholds = {m.name: m.alert_score for m in self.matchers}
+        decisions = []
+        for name, ranked in rankings.items():
+            for rank, (score, priority, g) in enumerate(ranked, 1):
+                if score <= thresholds[name]:
+                    break  # Ranked best first
+                message = {
+                    "profile": name,
+                    "program_name": g['program_name'],
+                    "funding_amount": g.get('funding_amount', 'Unknown'),
+                    "deadline": g.get('deadline', 'Unknown'),
+                    "relevance_score": score,
+                    "application_link": g.get('application_link', ''),
+                    "summary": f"🎯 {name}: {g['program_name']} ranks #{rank} ({score})"
+                }
+                # One alert per grant per profile (not per day), deduplicated by the outbox
+                alerter.send_webhook(message, key=f"{g['id']}|rank_{self.slug(name)}")
+                decisions.append((name, g['id'], score))
+        alerter.save()
+        return decisions
+
+# --- CLASS: BACKUP STORE ---
+class BackupStore:
+    """
+    Catalog snapshots in BACKUP_DIR: each one gzipped and stored once under
+    objects/<sha256>.js.gz, with index.json recording when it was taken, so
+    days on which nothing changed cost an index line rather than a copy.
+    prune() keeps the latest snapshot per day for the last BACKUP_DAILY_DAYS
+    days (today included, plus the one restore() takes of the file it
+    replaces) and the latest per ISO week before that. Saves hand snapshots to
+    a single background thread (snapshot_async) instead of waiting for them.
+    """
+    LEGACY_RE = re.compile(r'^grants_(\d{8})\.js$')  # The old one-full-copy-per-day backups
+
+    def __init__(self, backup_dir=BACKUP_DIR, daily_days=BACKUP_DAILY_DAYS):
+        self.backup_dir = backup_dir
+        self.objects_dir = os.path.join(backup_dir, 'objects')
+        self.index_file = os.path.join(backup_dir, 'index.json')
+        self.daily_days = daily_days
+        self.lock = threading.Lock()
+        self.executor = None
+        self.pending = []
+
+    def object_path(self, sha):
+        return os.path.join(self.objects_dir, sha + '.js.gz')
+
+    def load_index(self):
+        """Snapshot entries, oldest first. A corrupt index raises rather than orphaning every object."""
+        if not os.path.exists(self.index_file):
+            return []
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_index(self, entries):
+        atomic_write_text(self.index_file, json.dumps(entries, indent=1))
+
+    def put(self, entries, data, taken, grants=None, pre_restore=False):
+        sha = hashlib.sha256(data).hexdigest()
+        path = self.object_path(sha)
+        if not os.path.exists(path):
+            if not os.path.exists(self.objects_dir): os.makedirs(self.objects_dir)
+            atomic_write_bytes(path, gzip.compress(data, mtime=0))
+        entry = {"taken": taken.isoformat(timespec='seconds'), "sha256": sha, "bytes": len(data),
+                 "stored_bytes": os.path.getsize(path), "grants": grants}
+        if pre_restore: entry['pre_restore'] = True
+        entries.append(entry)
+        entries.sort(key=lambda e: e['taken'])
+        return entry
+
+    @instrumented('backup_store.snapshot')
+    def snapshot(self, data, grants=None, taken=None, pre_restore=False):
+        """Stores one grants.js snapshot (bytes) and applies retention. Returns its index entry."""
+        taken = taken or datetime.now()
+        with self.lock:
+            entries = self.load_index()
+            self.migrate_legacy(entries)
+            entry = self.put(entries, data, taken, grants, pre_restore)
+            self.prune(entries, taken)
+            self.save_index(entries)
+        return entry
+
+    def snapshot_async(self, data, grants=None):
+        """Queues a snapshot; data may be bytes or a callable producing them (run on the backup thread)."""
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='backup')
+        self.pending.append(self.executor.submit(self.run_snapshot, data, grants, datetime.now()))
+
+    def run_snapshot(self, data, grants, taken):
+        try:
+            return self.snapshot(data() if callable(data) else data, grants, taken)
+        except (OSError, ValueError) as e:
+            # The catalog itself is already saved; a failed backup must not take the run down
+            print(f"⚠️ Backup failed: {e}")
+
+    def wait(self):
+        """Blocks until queued snapshots are written."""
+        pending, self.pending = self.pending, []
+        for future in pending:
+            future.result()
+
+    def prune(self, entries, now=None):
+        """Applies the retention policy to entries in place and deletes unreferenced objects."""
+        today = (now or datetime.now()).date()
+        cutoff = today - timedelta(days=self.daily_days)
+        keep = {}
+        for e in entries:  # Oldest first, so the latest snapshot of each day/week wins
+            taken = datetime.fromisoformat(e['taken'])
+            if taken.date() >= cutoff:
+                # A daemon saving every few minutes would otherwise keep hundreds of copies a day
+                kind = 'pre_restore' if e.get('pre_restore') else 'day'
+                keep[(kind, taken.date().isoformat())] = e
+            else:
+                keep[('week',) + tuple(taken.isocalendar()[:2])] = e
+        entries[:] = sorted(keep.values(), key=lambda e: e['taken'])
+
+        live = {e['sha256'] + '.js.gz' for e in entries}
+        if os.path.exists(self.objects_dir):
+            for name in os.listdir(self.objects_dir):
+                if name.endswith('.js.gz') and name not in live:
+                    os.remove(os.path.join(self.objects_dir, name))
+
+    def migrate_legacy(self, entries):
+        """Moves old backups/grants_YYYYMMDD.js copies into the store. Returns how many were moved."""
+        if not os.path.exists(self.backup_dir):
+            return 0
+        moved = 0
+        for name in sorted(os.listdir(self.backup_dir)):
+            m = self.LEGACY_RE.match(name)
+            if not m:
+                continue
+            path = os.path.join(self.backup_dir, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            self.put(entries, data, datetime.strptime(m.group(1), "%Y%m%d"), self.count_grants(path))
+            os.remove(path)
+            moved += 1
+        return moved
+
+    def count_grants(self, path):
+        try:
+            return sum(1 for _ in iter_grants_file(path))
+        except GrantsFileError:
+            return None  # Still worth keeping
+
+    def entries(self):
+        """All snapshots, oldest first (moving any legacy copies in first)."""
+        with self.lock:
+            entries = self.load_index()
+            if self.migrate_legacy(entries):
+                self.prune(entries)
+                self.save_index(entries)
+        return entries
+
+    def find(self, date):
+        """The latest snapshot taken on or before date (a date or 'YYYY-MM-DD'), or None."""
+        if isinstance(date, str):
+            date = datetime.strptime(date, "%Y-%m-%d").date()
+        found = None
+        for e in self.entries():
+            if datetime.fromisoformat(e['taken']).date() <= date:
+                found = e
+        return found
+
+    def read(self, entry):
+        with open(self.object_path(entry['sha256']), 'rb') as f:
+            data = gzip.decompress(f.read())
+        if hashlib.sha256(data).hexdigest() != entry['sha256']:
+            raise GrantsFileError(f"Backup {entry['sha256'][:12]} is corrupt")
+        return data
+
+    def restore(self, date, path=GRANTS_FILE):
+        """Writes the snapshot for date over path. Returns its entry, or None if there is none that old."""
+        entry = self.find(date)
+        if entry is None:
+            return None
+        data = self.read(entry)
+        if os.path.exists(path):
+            # So the restore itself can be undone
+            with open(path, 'rb') as f:
+                self.snapshot(f.read(), self.count_grants(path), pre_restore=True)
+        atomic_write_bytes(path, data)
+        return entry
+
+# --- STORAGE BACKENDS ---
+class StorageBackend(abc.ABC):
+    """
+    Where the catalog is persisted. load() returns the grants in catalog order
+    (newest first), migrated and normalized. save() persists them given the
+    ids changed since the last save (full=True: grants were also removed) and
+    returns the grants.js contents if it wrote them, else None. Every backend
+    keeps grants.js current, since the dashboard and the nightly commit read it.
+    """
+    name = None
+
+    def __init__(self, grants_file=GRANTS_FILE):
+        self.grants_file = grants_file
+        self.bytes_written = 0
+        self.snapshot_stamp = None  # grants.js (mtime_ns, size) as last read or written here
+
+    @abc.abstractmethod
+    def load(self):
+        """The catalog, newest first."""
+
+    @abc.abstractmethod
+    def save(self, grants, index, dirty, full=False):
+        """Persists the catalog; returns the grants.js bytes it wrote, or None."""
+
+    def reset_from_file(self):
+        """Makes grants.js the whole catalog again (e.g. after a restore), dropping anything stored on top of it."""
+
+    def count_by(self, field):
+        """{value: count} for an indexed field, or None if the backend can't answer without the catalog."""
+        return None
+
+    def unmerged_bytes(self):
+        """Size of saved changes that are not in grants.js yet (a journal), which reset_from_file would drop."""
+        return 0
+
+    def stat_snapshot(self):
+        try:
+            st = os.stat(self.grants_file)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def snapshot_changed(self):
+        """True if grants.js was changed by someone else since this backend last read or wrote it."""
+        return self.stat_snapshot() != self.snapshot_stamp
+
+    def iter_grants(self):
+        """
+        Streams the stored catalog (newest first, migrated and normalized) one
+        grant at a time, without building it. Read-only: unlike load() it does
+        not count as having seen grants.js (see snapshot_changed).
+        """
+        return self.stream_snapshot()
+
+    def iter_snapshot(self):
+        """Streams grants.js (migrated and normalized) without building the catalog."""
+        self.snapshot_stamp = self.stat_snapshot()  # Before reading: an edit racing the read shows up as a change
+        return self.stream_snapshot()
+
+    def stream_snapshot(self):
+        if not os.path.exists(self.grants_file):
+            return
+        for g in iter_grants_file(self.grants_file):
+            yield prepare_grant(g)
+
+    @instrumented('storage.write_snapshot')
+    def write_snapshot(self, grants):
+        """Rewrites grants.js from the catalog. Returns the file contents."""
+        data = snapshot_bytes(grants)
+        if self.snapshot_stamp is not None and self.snapshot_changed():
+            print(f"⚠️ {self.grants_file} was changed by someone else since it was loaded; overwriting it.")
+        self.bytes_written += atomic_write_bytes(self.grants_file, data)
+        self.snapshot_stamp = self.stat_snapshot()
+        return data
+
+class SnapshotStorage(StorageBackend):
+    """Every save rewrites grants.js (atomically). Loading still replays a leftover journal, so switching modes is safe."""
+    name = 'snapshot'
+
+    def __init__(self, grants_file=GRANTS_FILE, journal_file=JOURNAL_FILE):
+        super().__init__(grants_file)
+        self.journal_file = journal_file
+
+    def load(self):
+        grants = list(self.iter_snapshot())
+        self.replay_journal(grants)
+        return grants
+
+    @instrumented('storage.replay_journal')
+    def replay_journal(self, grants):
+        """Applies the journal on top of the loaded snapshot. Returns the number of records applied."""
+        if not os.path.exists(self.journal_file):
+            return 0
+
+        index = {}
+        for g in grants:
+            index.setdefault(g['id'], g)
+        applied = 0
+        added = []
+        for record in iter_journal_file(self.journal_file):
+            grant = restore_grant(record['grant'])
+            existing = index.get(grant['id'])
+            if existing is not None:
+                # Replace in place so the grant keeps its position (and replays are idempotent)
+                existing.clear()
+                existing.update(grant)
+            else:
+                index[grant['id']] = grant
+                added.append(grant)
+            applied += 1
+
+        if added:
+            grants[0:0] = added[::-1]
+        return applied
+
+    def iter_grants(self):
+        """Same as load() would return, streamed: the journal is applied on the fly (it is small, grants.js isn't)."""
+        if not os.path.exists(self.journal_file):
+            yield from self.stream_snapshot()
+            return
+        journaled = {}  # id -> latest record, in order of first appearance
+        for record in iter_journal_file(self.journal_file):
+            journaled[record['grant']['id']] = record['grant']
+        if not journaled:
+            yield from self.stream_snapshot()
+            return
+        # Grants the snapshot doesn't have come first (newest first), as in replay_journal
+        in_snapshot = set()
+        if os.path.exists(self.grants_file):
+            in_snapshot = {g['id'] if 'id' in g else grant_id(g) for g in iter_grants_file(self.grants_file)}
+        for gid in reversed([gid for gid in journaled if gid not in in_snapshot]):
+            yield restore_grant(journaled[gid])
+        for g in self.stream_snapshot():
+            update = journaled.pop(g['id'], None) if g['id'] in in_snapshot else None
+            in_snapshot.discard(g['id'])  # Only the first copy of an id is replaced
+            yield g if update is None else restore_grant(update)
+
+    def save(self, grants, index, dirty, full=False):
+        data = self.compact(grants)
+        print(f"💾 Database saved. Total grants: {len(grants)}")
+        return data
+
+    def compact(self, grants):
+        """Writes grants.js; everything in the journal is now part of it."""
+        data = self.write_snapshot(grants)
+        self.reset_from_file()
+        return data
+
+    def reset_from_file(self):
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+
+    def unmerged_bytes(self):
+        return os.path.getsize(self.journal_file) if os.path.exists(self.journal_file) else 0
+
+class JournalStorage(SnapshotStorage):
+    """
+    Saves append only the added/updated grants to grants.journal.jsonl; the
+    journal is folded back into grants.js once it grows past
+    JOURNAL_COMPACT_BYTES or the snapshot is JOURNAL_COMPACT_AGE_DAYS old.
+
+    Local use only: the journal is not committed, so in CI (the nightly
+    workflow pins 'snapshot') journaled changes would be lost between runs.
+    """
+    name = 'journal'
+
+    def save(self, grants, index, dirty, full=False):
+        if full:
+            # Removals (e.g. dedup_catalog) cannot be journaled as upserts
+            data = self.compact(grants)
+            print(f"💾 Database rewritten. Total grants: {len(grants)}")
+            return data
+        data = None
+        written = self.append_journal(index, dirty)
+        if self.needs_compaction():
+            data = self.compact(grants)
+            print(f"🗜️ Journal compacted into {self.grants_file}.")
+        print(f"💾 Journal updated ({written} changes). Total grants: {len(grants)}")
+        return data
+
+    @instrumented('storage.append_journal')
+    def append_journal(self, index, dirty):
+        """Appends one upsert record per dirty grant. Returns the number of records written."""
+        if not dirty:
+            return 0
+        ts = datetime.now().isoformat()
+        lines = []
+        for grant_id in dirty:
+            grant = index.get(grant_id)
+            if grant is not None:
+                lines.append(json.dumps({"op": "upsert", "ts": ts, "grant": grant}, default=grant_json) + "\n")
+        data = ''.join(lines).encode('utf-8')
+        if os.path.exists(self.journal_file):
+            truncate_torn_tail(self.journal_file)
+        with open(self.journal_file, 'ab') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self.bytes_written += len(data)
+        return len(lines)
+
+    def needs_compaction(self):
+        if not os.path.exists(self.journal_file):
+            return False
+        if os.path.getsize(self.journal_file) >= JOURNAL_COMPACT_BYTES:
+            return True
+        if not os.path.exists(self.grants_file):
+            return True
+        age = time.time() - os.path.getmtime(self.grants_file)
+        return age >= JOURNAL_COMPACT_AGE_DAYS * 86400
+
+class SQLiteStorage(StorageBackend):
+    """
+    Catalog in an SQLite database (GRANTS_DB, WAL mode), one row per grant
+    with indexed priority, deadline and status columns next to the grant's
+    JSON. A save upserts the changed grants in one transaction and then
+    regenerates grants.js as an export. The first load seeds the database
+    from grants.js (+ journal).
+    """
+    name = 'sqlite'
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS grants (
+            id TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,  -- counted from the oldest, so prepending never renumbers
+            priority TEXT,
+            deadline_ordinal INTEGER,
+            status TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS grants_position ON grants (position);
+        CREATE INDEX IF NOT EXISTS grants_priority ON grants (priority);
+        CREATE INDEX IF NOT EXISTS grants_deadline ON grants (deadline_ordinal);
+        CREATE INDEX IF NOT EXISTS grants_status ON grants (status);
+    """
+    INDEXED = ['priority', 'status']  # Fields count_by can answer from an index
+
+    def __init__(self, grants_file=GRANTS_FILE, db_file=GRANTS_DB):
+        super().__init__(grants_file)
+        self.db_file = db_file
+        self.conn = None
+
+    def connect(self):
+        if self.conn is None:
+            # The backup thread never touches the database, but daemon/HTTP threads may read it
+            self.conn = sqlite3.connect(self.db_file, check_same_thread=False)
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('PRAGMA synchronous=NORMAL')
+            self.conn.executescript(self.SCHEMA)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    @instrumented('storage.sqlite_load')
+    def load(self):
+        conn = self.connect()
+        self.snapshot_stamp = self.stat_snapshot()  # grants.js is our export; later edits to it are outside changes
+        rows = conn.execute('SELECT data FROM grants ORDER BY position DESC').fetchall()
+        if not rows:
+            grants = SnapshotStorage(self.grants_file).load()
+            if grants:
+                self.upsert(grants, {g['id']: g for g in grants[::-1]}, None, replace=True)
+            return grants
+        return [restore_grant(json.loads(data)) for data, in rows]
+
+    def iter_grants(self):
+        rows = self.connect().execute('SELECT data FROM grants ORDER BY position DESC')
+        first = rows.fetchone()
+        if first is None:
+            yield from SnapshotStorage(self.grants_file).iter_grants()  # Not migrated yet
+            return
+        yield restore_grant(json.loads(first[0]))
+        for data, in rows:
+            yield restore_grant(json.loads(data))
+
+    def save(self, grants, index, dirty, full=False):
+        written = self.upsert(grants, index, dirty, replace=full)
+        print(f"💾 Database updated ({written} changes). Total grants: {len(grants)}")
+        return self.write_snapshot(grants)  # The export the dashboard and the nightly commit read
+
+    @instrumented('storage.sqlite_upsert')
+    def upsert(self, grants, index, dirty, replace=False):
+        """Writes the dirty grants (all of them if replace) in one transaction. Returns the number written."""
+        positions = {}
+        for i, g in enumerate(grants):
+            positions.setdefault(g['id'], len(grants) - i)
+        ids = positions if replace else [gid for gid in dirty if gid in positions]
+        rows = []
+        for gid in ids:
+            g = index[gid]
+            data = json.dumps(g, ensure_ascii=False, default=grant_json)
+            rows.append((gid, positions[gid], g.get('priority'), g.get('deadline_ordinal'), g.get('status'), data))
+            self.bytes_written += len(data)
+        conn = self.connect()
+        with conn:
+            if replace:
+                conn.execute('DELETE FROM grants')
+            conn.executemany('INSERT OR REPLACE INTO grants (id, position, priority, deadline_ordinal, status, data) '
+                             'VALUES (?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def reset_from_file(self):
+        with self.connect() as conn:
+            conn.execute('DELETE FROM grants')
+        SnapshotStorage(self.grants_file).reset_from_file()
+
+    def count_by(self, field):
+        if field not in self.INDEXED:
+            return None
+        return dict(self.connect().execute(f'SELECT {field}, COUNT(*) FROM grants GROUP BY {field}').fetchall())
+
+STORAGE_BACKENDS = {cls.name: cls for cls in (SnapshotStorage, JournalStorage, SQLiteStorage)}
+
+# --- ENRICHMENT ---
+def enrich_finding(new_grant, scorer, now):
+    """Stamps id, derived fields, score and tracking defaults onto a raw finding, in place."""
+    new_grant['id'] = grant_id(new_grant)
+    new_grant['source_category'] = new_grant.get('source_category', 'Private')
+    normalize_grant(new_grant)
+    new_grant['relevance_score'] = scorer.calculate_score(new_grant, now)
+    new_grant['priority'] = scorer.determine_priority(new_grant['relevance_score'])
+    new_grant['status'] = "Not Applied"
+    new_grant['notes'] = ""
+    new_grant['added_date'] = now.strftime("%Y-%m-%d")
+    new_grant['last_updated'] = now.strftime("%Y-%m-%d")
+    # New Enriched Fields
+    new_grant['awards_available'] = new_grant.get('awards_available', 'Unknown')
+    new_grant['open_date'] = new_grant.get('open_date', 'Unknown')
+    return new_grant
+
+_worker_state = None  # (profile, GrantScorer, NearDuplicateIndex) per pool process
+
+def enrich_chunk(chunk, now, profile=None):
+    """
+    Process-pool task: enriches (pickled copies of) a slice of a batch and
+    computes their MinHash signatures. Returns [(grant, signature)]. profile
+    is the parent scorer's matcher profile (None: built-in rules), so workers
+    score exactly like the parent instead of reading profile.json themselves.
+    """
+    global _worker_state
+    if _worker_state is None or _worker_state[0] != profile:
+        scorer = GrantScorer()
+        scorer.matcher = ProfileMatcher(profile) if profile is not None else None
+        _worker_state = (profile, scorer, NearDuplicateIndex())
+    _, scorer, near_dups = _worker_state
+    for g in chunk:
+        enrich_finding(g, scorer, now)
+    return list(zip(chunk, near_dups.signature_batch(chunk)))
 
 # --- CLASS: GRANT MANAGER ---
 class GrantManager:
-    def __init__(self):
+    """
+    Owns the grant catalog in memory (list + indexes); persistence is delegated
+    to a StorageBackend picked by GRANT_STORAGE_MODE (see STORAGE_BACKENDS).
+    """
+    def __init__(self, storage_mode=None):
         self.grants = []
+        self.index = {}  # id -> grant, kept in sync with self.grants
+        self.deadlines = DeadlineIndex()  # open dated grants, sorted by deadline
+        self.near_dups = None  # NearDuplicateIndex, built on first use (see near_duplicates)
+        self.near_dup_mode = NEAR_DUP_MODE
+        self.saved_fingerprint = None  # catalog_fingerprint() of what is on disk; None = never saved/loaded
+        self.score_keys = {}  # id -> (fingerprint, day) the current score was computed for
+        self.dirty = {}  # ids changed since the last save (dict keeps insertion order)
+        self.storage_mode = storage_mode or STORAGE_MODE
+        if self.storage_mode not in STORAGE_BACKENDS:
+            raise ValueError(f"Unknown storage mode {self.storage_mode!r} (expected one of {', '.join(STORAGE_BACKENDS)})")
+        self.storage = STORAGE_BACKENDS[self.storage_mode]()
         self.ensure_dirs()
         self.scorer = GrantScorer()
         self.alerter = AlertManager()
+        self.exporter = DashboardExporter()
+        self.backups = BackupStore()
+        self.enrich_workers = ENRICH_WORKERS
+        self.enrich_chunk_size = ENRICH_CHUNK_SIZE
+        self.parallel_min = ENRICH_PARALLEL_MIN
+        self.enrich_pool = None  # ProcessPoolExecutor, started by the first large batch
+        self.compact = COMPACT_GRANTS
     
+    @property
+    def bytes_written(self):
+        """grants.js + journal/database bytes, for the run log."""
+        return self.storage.bytes_written
+
     def ensure_dirs(self):
         if not os.path.exists(LOGS_DIR): os.makedirs(LOGS_DIR)
         if not os.path.exists(BACKUP_DIR): os.makedirs(BACKUP_DIR)
 
+    def iter_grants(self):
+        """Streams the stored catalog one grant at a time (plain dicts, newest first), whatever the storage mode."""
+        return self.storage.iter_grants()
+
+    @instrumented('grant_manager.load_grants')
     def load_grants(self):
-        if not os.path.exists(GRANTS_FILE):
-            return []
-        
-        with open(GRANTS_FILE, 'r', encoding='utf-8') as f:
-            content = f.read()
-            
-        if 'window.grantsData =' in content:
-            json_str = content.replace('window.grantsData = ', '').strip().rstrip(';')
-        else:
-            json_str = content 
-            
-        try:
-            self.grants = json.loads(json_str)
-            # Migration
-            for g in self.grants:
-                if 'id' not in g: g['id'] = self.generate_id(g)
-            return self.grants
-        except json.JSONDecodeError:
-            return []
+        """Loads the catalog from storage. Raises GrantsFileError if grants.js or the journal is malformed."""
+        grants = self.storage.load()
+        if self.compact:
+            for i, g in enumerate(grants):
+                grants[i] = Grant(g)  # One at a time, so the dicts are freed as we go
+        self.grants = grants
+        self.rebuild_index()
+        self.dirty = {}
+        self.saved_fingerprint = self.catalog_fingerprint()
+        return self.grants
+
+    @instrumented('grant_manager.rebuild_index')
+    def rebuild_index(self):
+        """Rebuilds the id -> grant index. The first occurrence of an id wins, like the old linear scan."""
+        self.index = {}
+        for g in self.grants:
+            self.index.setdefault(g['id'], g)
+        self.deadlines.rebuild(self.index.values())
+        self.near_dups = None
+
+    @instrumented('grant_manager.near_dup_index')
+    def near_duplicates(self):
+        """The near-duplicate index, built from the catalog the first time ingest needs it."""
+        if self.near_dups is None:
+            self.near_dups = NearDuplicateIndex()
+            grants = list(self.index.values())
+            for g, sig in zip(grants, self.near_dups.signature_batch(grants)):
+                self.near_dups.add(g, sig)
+        return self.near_dups
+
+    def new_signatures(self, batch):
+        """{position: MinHash signature} for the batch's grants that are not in the catalog yet, computed in one go."""
+        new = [i for i, g in enumerate(batch) if self.generate_id(g) not in self.index]
+        if not new:
+            return {}
+        return dict(zip(new, self.near_duplicates().signature_batch([batch[i] for i in new])))
+
+    def record(self, grant):
+        """The catalog's representation of an enriched grant: a Grant when compact, else the dict itself."""
+        return Grant(grant) if self.compact else grant
 
     def generate_id(self, grant):
-        unique_string = f"{grant.get('program_name','')}|{grant.get('provider','')}"
-        return hashlib.md5(unique_string.encode()).hexdigest()
-
-    def save_grants(self):
-        # Backup
-        timestamp = datetime.now().strftime("%Y%m%d")
-        backup_file = os.path.join(BACKUP_DIR, f'grants_{timestamp}.js')
-        if not os.path.exists(backup_file) and os.path.exists(GRANTS_FILE):
-             shutil.copy(GRANTS_FILE, backup_file)
-        
+        return grant_id(grant)
+
+    @instrumented('grant_manager.catalog_fingerprint')
+    def catalog_fingerprint(self):
+        """Hash over every grant's id, content fingerprint and tracking state, in catalog order."""
+        h = hashlib.sha1()
+        for g in self.grants:
+            h.update(json.dumps([g['id'], g.get('fingerprint'), [g.get(k) for k in RECORD_STATE_FIELDS]],
+                                ensure_ascii=False).encode('utf-8'))
+        return h.hexdigest()
+
+    @instrumented('grant_manager.save_grants')
+    def save_grants(self, full=False):
+        """
+        Persists the catalog. Returns False (and touches nothing but a stale
+        dashboard export) if nothing changed since the last load/save.
+        """
+        fingerprint = self.catalog_fingerprint()
+        if not full and fingerprint == self.saved_fingerprint and os.path.exists(GRANTS_FILE):
+            print(f"💤 No changes to save. Total grants: {len(self.grants)}")
+            self.dirty = {}
+            # grants.js edited by hand or by a commit since the last export: data/ still has to follow it
+            if self.exporter.exported_catalog() != fingerprint:
+                self.exporter.export(self.grants, fingerprint)
+                print("📤 Dashboard export was out of date; re-exported.")
+            return False
+
+        # Alerts queued for these grants go to disk first, so a crash can't keep the grants and lose their alerts
+        self.alerter.save()
+
         # Save
-        with open(GRANTS_FILE, 'w', encoding='utf-8') as f:
-            f.write(f"window.grantsData = {json.dumps(self.grants, indent=2)};")
-        print(f"💾 Database saved. Total grants: {len(self.grants)}")
+        data = self.storage.save(self.grants, self.index, self.dirty, full)
+
+        # Backup (written on the backup thread)
+        with INSTRUMENTS.span('grant_manager.backup'):
+            if data is None:
+                # Serialize off the critical path, from copies so later edits don't leak in
+                copies = [g.copy() for g in self.grants]
+                data = lambda: snapshot_bytes(copies)
+            self.backups.snapshot_async(data, len(self.grants))
+        self.exporter.export(self.grants, fingerprint)
+        self.dirty = {}
+        self.saved_fingerprint = fingerprint
+        return True
+
+    @instrumented('grant_manager.enrich')
+    def enrich_grant(self, new_grant, now=None):
+        return enrich_finding(new_grant, self.scorer, now or datetime.now())
+
+    @instrumented('grant_manager.enrich_parallel')
+    def enrich_parallel(self, batch, now):
+        """
+        [(enriched copy, MinHash signature)] for batch, in order, computed in the
+        process pool; None if the pool is unavailable (the caller then enriches
+        serially).
+        """
+        chunks = [batch[i:i + self.enrich_chunk_size] for i in range(0, len(batch), self.enrich_chunk_size)]
+        try:
+            if self.enrich_pool is None:
+                # spawn, not fork: a forked child could inherit a lock held by an alert, backup or HTTP thread
+                self.enrich_pool = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.enrich_workers, mp_context=multiprocessing.get_context('spawn'))
+            profile = self.scorer.matcher.profile if self.scorer.matcher is not None else None
+            enriched = []
+            for part in self.enrich_pool.map(enrich_chunk, chunks, [now] * len(chunks), [profile] * len(chunks)):
+                enriched.extend(part)
+        except (OSError, concurrent.futures.BrokenExecutor) as e:
+            print(f"⚠️ Parallel enrichment unavailable ({e}); enriching serially.")
+            self.close_pool()
+            return None
+        self.scorer.scored += len(enriched)
+        return enriched
+
+    def close_pool(self):
+        if self.enrich_pool is not None:
+            self.enrich_pool.shutdown(wait=False)
+            self.enrich_pool = None
+
+    @instrumented('grant_manager.dedup')
+    def merge_grant(self, new_grant, sig=None):
+        """
+        Dedups an enriched grant against the index. Returns UPDATED/DUPLICATE,
+        or None if it is new. A new grant that is a near duplicate of a known
+        one is merged into it (NEAR_DUP_MODE 'merge') or added with
+        near_duplicate_of / near_duplicate_score set ('flag'). sig is the
+        grant's MinHash signature if it was already computed.
+        """
+        existing = self.index.get(new_grant['id'])
+        if existing is None:
+            near_dups = self.near_duplicates()
+            sig = sig or near_dups.signature(new_grant)
+            matches = near_dups.query(new_grant, sig=sig, catalog=self.index) if sig else []
+            if matches and self.near_dup_mode == 'merge':
+                existing = self.index[matches[0][1]]
+                print(f"🧬 Near duplicate of {existing['program_name']} ({matches[0][0]:.0%}): {new_grant['program_name']}")
+                # Keep the known listing's name/provider so alternating wordings don't count as changes
+                new_grant.update(id=existing['id'], program_name=existing['program_name'], provider=existing['provider'])
+                new_grant['fingerprint'] = content_fingerprint(new_grant)
+                INSTRUMENTS.count("ingest.near_duplicate")
+            else:
+                if matches:
+                    new_grant['near_duplicate_of'] = matches[0][1]
+                    new_grant['near_duplicate_score'] = matches[0][0]
+                    INSTRUMENTS.count("ingest.near_duplicate")
+                # Indexed now so later grants in the same batch are compared against it
+                near_dups.add(new_grant, sig)
+                return None
 
+        if existing.get('fingerprint') == new_grant['fingerprint']:
+            return "DUPLICATE"
+
+        # Only fields the finding actually has: a sparser source (RSS: name, link, summary) re-listing a
+        # grant must not wipe what a richer one found. A missing, null or defaulted field keeps its value.
+        changes = [k for k in SOURCE_FIELDS
+                   if new_grant.get(k) not in (None, SOURCE_FIELD_DEFAULTS.get(k))
+                   and existing.get(k, SOURCE_FIELD_DEFAULTS.get(k)) != new_grant[k]]
+        if changes:
+            print(f"🔄 Grant Updated: {new_grant['program_name']} (Changes: {', '.join(changes)})")
+            # Only source fields (and what is derived from them) change; tracking state is ours
+            for key in changes:
+                existing[key] = new_grant[key]
+            normalize_grant(existing)
+            existing['relevance_score'] = self.scorer.calculate_score(existing)
+            existing['priority'] = self.scorer.determine_priority(existing['relevance_score'])
+            existing['last_updated'] = datetime.now().strftime("%Y-%m-%d")
+            self.deadlines.update(existing)
+            if self.near_dups is not None: self.near_dups.add(existing)
+            self.dirty[existing['id']] = None
+            return "UPDATED"
+        return "DUPLICATE"
+
+    @instrumented('grant_manager.dedup_catalog')
+    def dedup_catalog(self, threshold=NEAR_DUP_THRESHOLD, apply=False):
+        """
+        One-off pass over the whole catalog: each grant is compared against the
+        grants kept before it (newest first, so the freshest listing survives).
+        Returns [(dropped, kept, similarity)]. With apply=True the duplicates
+        are removed and grants.js is rewritten; a tracked status/notes on a
+        dropped copy is carried over if the kept one is still untouched.
+        """
+        near_dups = NearDuplicateIndex()
+        kept = {}
+        pairs = []
+        for g, sig in zip(self.grants, near_dups.signature_batch(self.grants)):
+            if g['id'] in kept:
+                pairs.append((g, kept[g['id']], 1.0))
+                continue
+            matches = near_dups.query(g, threshold, sig=sig, catalog=kept)
+            if matches:
+                pairs.append((g, kept[matches[0][1]], matches[0][0]))
+                continue
+            kept[g['id']] = g
+            near_dups.add(g, sig)
+
+        if apply and pairs:
+            today = datetime.now().strftime("%Y-%m-%d")
+            for dropped, survivor, _ in pairs:
+                if survivor.get('status', 'Not Applied') == 'Not Applied' and dropped.get('status', 'Not Applied') != 'Not Applied':
+                    survivor['status'] = dropped['status']
+                    survivor['notes'] = survivor.get('notes') or dropped.get('notes', '')
+                survivor.pop('near_duplicate_of', None)
+                survivor.pop('near_duplicate_score', None)
+                survivor['last_updated'] = today
+            self.grants = list(kept.values())
+            self.rebuild_index()
+            self.near_dups = near_dups
+            self.save_grants(full=True)
+        return pairs
+
+    def unchanged(self, new_grant):
+        """True if this exact listing is already in the catalog, so there is nothing to enrich, score or merge."""
+        existing = self.index.get(self.generate_id(new_grant))
+        return existing is not None and existing.get('fingerprint') == content_fingerprint(new_grant)
+
+    @instrumented('grant_manager.add_grant')
     def add_grant(self, new_grant):
+        if self.unchanged(new_grant):
+            INSTRUMENTS.count("ingest.unchanged")
+            return "DUPLICATE"
+
         # 1. Enrich
-        new_grant['id'] = self.generate_id(new_grant)
-        new_grant['source_category'] = new_grant.get('source_category', 'Private')
-        new_grant['relevance_score'] = self.scorer.calculate_score(new_grant)
-        new_grant['priority'] = self.scorer.determine_priority(new_grant['relevance_score'])
-        new_grant['status'] = "Not Applied"
-        new_grant['notes'] = ""
-        new_grant['added_date'] = datetime.now().strftime("%Y-%m-%d")
-        new_grant['last_updated'] = datetime.now().strftime("%Y-%m-%d")
-        # New Enriched Fields
-        new_grant['awards_available'] = new_grant.get('awards_available', 'Unknown')
-        new_grant['open_date'] = new_grant.get('open_date', 'Unknown')
+        self.enrich_grant(new_grant)
 
         # 2. Dedup
-        existing = next((g for g in self.grants if g['id'] == new_grant['id']), None)
-        
-        if existing:
-            changes = []
-            for key in ['deadline', 'funding_amount', 'application_link']:
-                if existing.get(key) != new_grant.get(key):
-                    changes.append(key)
-            
-            if changes:
-                print(f"🔄 Grant Updated: {new_grant['program_name']} (Changes: {', '.join(changes)})")
-                existing.update({k: v for k, v in new_grant.items() if k not in ['status', 'notes', 'added_date']})
-                existing['last_updated'] = datetime.now().strftime("%Y-%m-%d")
-                return "UPDATED"
-            else:
-                return "DUPLICATE"
-        else:
-            self.grants.insert(0, new_grant)
-            # 3. ALERT
-            self.alerter.check_new_grant(new_grant)
-            return "ADDED"
-            
-    def run_deadline_check(self):
-        self.alerter.check_deadlines(self.grants)
+        result = self.merge_grant(new_grant)
+        if result:
+            INSTRUMENTS.count(f"ingest.{result.lower()}")
+            return result
+
+        new_grant = self.record(new_grant)
+        self.grants.insert(0, new_grant)
+        self.index[new_grant['id']] = new_grant
+        self.deadlines.update(new_grant)
+        self.dirty[new_grant['id']] = None
+        # 3. ALERT
+        self.alerter.check_new_grant(new_grant)
+        INSTRUMENTS.count("ingest.added")
+        return "ADDED"
+
+    @instrumented('grant_manager.add_grants')
+    def add_grants(self, batch):
+        """
+        Bulk upsert. Returns one ADDED/UPDATED/DUPLICATE result per input grant,
+        identical to calling add_grant on each in turn, but new grants are
+        prepended in a single pass (newest first) instead of one insert each.
+
+        Batches of at least parallel_min findings are enriched in a process
+        pool first; merges still run here, in input order, so the results and
+        the catalog are the same as with serial enrichment.
+        """
+        now = datetime.now()  # One timestamp per batch, so serial and parallel runs agree
+        enriched = None
+        if self.enrich_workers > 1 and len(batch) >= self.parallel_min:
+            enriched = self.enrich_parallel(batch, now)
+
+        # Signatures up front: one numpy call for the whole batch instead of one per new grant
+        sigs = self.new_signatures(batch) if enriched is None else {}
+        results = []
+        added = []
+        try:
+            for i, new_grant in enumerate(batch):
+                if enriched is None:
+                    if self.unchanged(new_grant):
+                        results.append("DUPLICATE")
+                        INSTRUMENTS.count("ingest.unchanged")
+                        continue
+                    self.enrich_grant(new_grant, now)
+                else:
+                    grant, sig = enriched[i]
+                    existing = self.index.get(grant['id'])
+                    if existing is not None and existing.get('fingerprint') == grant['fingerprint']:
+                        results.append("DUPLICATE")
+                        INSTRUMENTS.count("ingest.unchanged")
+                        continue
+                    new_grant.update(grant)  # Same dict, same keys and order as enrich_grant in place
+                result = self.merge_grant(new_grant, sig=sigs.get(i) if enriched is None else enriched[i][1])
+                if not result:
+                    new_grant = self.record(new_grant)
+                    # Index immediately so later copies in the same batch dedup against it
+                    self.index[new_grant['id']] = new_grant
+                    self.deadlines.update(new_grant)
+                    self.dirty[new_grant['id']] = None
+                    added.append(new_grant)
+                    result = "ADDED"
+                results.append(result)
+                INSTRUMENTS.count(f"ingest.{result.lower()}")
+        finally:
+            # Also after a failure: what was already indexed must be in the catalog too
+            if added:
+                self.grants[0:0] = added[::-1]
+                for new_grant in added:
+                    self.alerter.check_new_grant(new_grant)
+        return results
+
+    @instrumented('grant_manager.rescore_grants')
+    def rescore_grants(self, now=None):
+        """
+        Re-scores, in one batch, the grants whose content changed since they
+        were last scored here, plus dated grants on a new day (urgency drifts
+        as deadlines approach). Returns the number of grants re-scored.
+        """
+        day = days_base(now or datetime.now())
+        stale = []
+        for g in self.grants:
+            key = (g.get('fingerprint'), day if g.get('deadline_kind') == DEADLINE_DATE else None)
+            if self.score_keys.get(g['id']) != key:
+                self.score_keys[g['id']] = key
+                stale.append(g)
+        if not stale:
+            return 0
+        scores, priorities = self.scorer.score_many(stale, now=now)
+        for g, score, priority in zip(stale, scores, priorities):
+            if g.get('relevance_score') != score or g.get('priority') != priority:
+                self.dirty[g['id']] = None
+            g['relevance_score'] = score
+            g['priority'] = priority
+        return len(stale)
+
+    def count_by(self, field):
+        """{value: count} of a field (e.g. priority) over the catalog, from the storage indexes when it is saved."""
+        counts = None if self.dirty else self.storage.count_by(field)
+        if counts is None:
+            counts = {}
+            for g in self.grants:
+                counts[g.get(field)] = counts.get(g.get(field), 0) + 1
+        return counts
+
+    @instrumented('grant_manager.deadline_check')
+    def run_deadline_check(self, now=None):
+        """Deadline alerts for every window in ALERT_DEADLINE_DAYS, answered from the deadline index."""
+        due = [(days, self.index[gid]) for days in ALERT_DEADLINE_DAYS
+               for gid in self.deadlines.due_in(days, now)]
+        self.alerter.alert_deadlines(due)
 
 # --- CLASS: LOGGER ---
+class StageTimer:
+    """Wall-clock time per named stage of a run, e.g. `with timer.stage('scan'): ...`."""
+    def __init__(self):
+        self.timings = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(self.timings.get(name, 0.0) + time.perf_counter() - started, 4)
+
 class Auditor:
-    def log_run(self, grants_scanned, grants_added, errors=None):
+    """
+    Run log in LOG_FILE, one JSON entry per line, append-only. The active
+    file is rotated to agent_log-<timestamp>.jsonl(.gz) by size or age, and
+    nothing is ever truncated. iter_entries()/summarize() stream across the
+    rotated segments without loading them all at once.
+    """
+    def __init__(self, log_file=LOG_FILE):
+        self.log_file = log_file
+        self.log_dir = os.path.dirname(log_file) or '.'
+        self.base = os.path.splitext(os.path.basename(log_file))[0]
+
+    @instrumented('auditor.log_run')
+    def log_run(self, grants_scanned, grants_added, errors=None, metrics=None):
         entry = {
             "timestamp": datetime.now().isoformat(),
             "grants_scanned": grants_scanned,
             "grants_added": grants_added,
             "errors": errors or []
         }
-        
-        logs = []
-        if os.path.exists(LOG_FILE):
-            with open(LOG_FILE, 'r') as f:
-                try: logs = json.load(f)
-                except: pass
-        
-        logs.append(entry)
-        logs = logs[-50:]
-        
-        with open(LOG_FILE, 'w') as f:
-            json.dump(logs, f, indent=2)
+        if metrics:
+            entry.update(metrics)
+
+        self.migrate_legacy()
+        if self.needs_rotation():
+            self.rotate()
+        with open(self.log_file, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return entry
+
+    # --- Rotation ---
+    def migrate_legacy(self):
+        """Moves entries from the old agent_log.json array into the JSONL log, once."""
+        legacy = os.path.join(self.log_dir, os.path.basename(LEGACY_LOG_FILE))
+        if not os.path.exists(legacy) or os.path.exists(self.log_file):
+            return
+        try:
+            with open(legacy, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except ValueError:
+            entries = []
+        atomic_write_text(self.log_file, ''.join(json.dumps(e) + "\n" for e in entries))
+        os.remove(legacy)
+
+    def needs_rotation(self):
+        if not os.path.exists(self.log_file):
+            return False
+        if os.path.getsize(self.log_file) >= LOG_ROTATE_BYTES:
+            return True
+        with open(self.log_file, 'r', encoding='utf-8') as f:
+            first = f.readline()
+        try:
+            started = datetime.fromisoformat(json.loads(first)['timestamp'])
+        except (ValueError, KeyError, TypeError):
+            return False
+        return datetime.now() - started >= timedelta(days=LOG_ROTATE_DAYS)
+
+    def rotate(self):
+        while True:
+            stamp = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+            segment = os.path.join(self.log_dir, f"{self.base}-{stamp}.jsonl")
+            if not os.path.exists(segment) and not os.path.exists(segment + '.gz'): break
+        os.replace(self.log_file, segment)
+        if LOG_COMPRESS_ROTATED:
+            with open(segment, 'rb') as src, gzip.open(segment + '.gz', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(segment)
+        return segment
+
+    # --- Reader ---
+    def segments(self):
+        """Log files oldest first: rotated segments (timestamped names sort chronologically), then the active log."""
+        pattern = re.compile(re.escape(self.base) + r'-\d{8}T\d{12}\.jsonl(\.gz)?$')
+        rotated = sorted(f for f in os.listdir(self.log_dir) if pattern.match(f)) if os.path.isdir(self.log_dir) else []
+        files = [os.path.join(self.log_dir, f) for f in rotated]
+        if os.path.exists(self.log_file):
+            files.append(self.log_file)
+        return files
+
+    def iter_entries(self, since=None):
+        """Streams entries oldest first, optionally only those at or after `since` (a datetime)."""
+        cutoff = since.isoformat() if since else None
+        for path in self.segments():
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt', encoding='utf-8') as f:
+                for line in f:
+                    if not line.strip(): continue
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn line from a crash mid-append
+                    if cutoff and entry.get('timestamp', '') < cutoff: continue
+                    yield entry
+
+    def summarize(self, since=None):
+        """Aggregates run trends in one streaming pass: totals, averages and per-day counts."""
+        summary = {"runs": 0, "grants_scanned": 0, "grants_added": 0, "runs_with_errors": 0,
+                   "wall_time_total": 0.0, "cache_hits": 0, "cache_misses": 0,
+                   "alerts_sent": 0, "alerts_failed": 0, "bytes_written": 0, "by_day": {}}
+        for entry in self.iter_entries(since):
+            summary['runs'] += 1
+            summary['grants_scanned'] += entry.get('grants_scanned', 0)
+            summary['grants_added'] += entry.get('grants_added', 0)
+            if entry.get('errors'): summary['runs_with_errors'] += 1
+            summary['wall_time_total'] += entry.get('wall_time', 0.0)
+            summary['cache_hits'] += entry.get('cache', {}).get('hits', 0)
+            summary['cache_misses'] += entry.get('cache', {}).get('misses', 0)
+            summary['alerts_sent'] += entry.get('alerts', {}).get('sent', 0)
+            summary['alerts_failed'] += entry.get('alerts', {}).get('failed', 0)
+            summary['bytes_written'] += entry.get('bytes_written', 0)
+            day = summary['by_day'].setdefault(entry.get('timestamp', '')[:10], {"runs": 0, "grants_added": 0})
+            day['runs'] += 1
+            day['grants_added'] += entry.get('grants_added', 0)
+        if summary['runs']:
+            summary['wall_time_avg'] = round(summary['wall_time_total'] / summary['runs'], 4)
+        return summary
 
 # --- SIMULATION LOGIC ---
-def ai_scan_simulation(manager):
-    print("\n🔍 AI Agent Initialized (v2.1 - Alerts Enabled)...")
-    time.sleep(1)
-    
-    # Mock Findings
-    potential_findings = [
-        {
-            "program_name": "OpenAI Residency",
-            "provider": "OpenAI",
-            "country": "US (Remote Friendly)",
-            "sector_focus": "AI, ML Research",
-            "funding_type": "Salary + Equity",
-            "funding_amount": "$210,000 / year",
-            "eligibility_summary": "Exceptional researchers.",
-            "deadline": "2026-06-01", 
-            "application_link": "https://openai.com/careers",
-            "source_category": "Private",
-            "effort_level": "High"
-        },
-        {
-            "program_name": "Fast Track High Score Grant",
-            "provider": "Test Provider",
-            "country": "Global",
-            "sector_focus": "General",
-            "funding_type": "Grant",
-            "funding_amount": "$100,000",
-            "eligibility_summary": "Open to all.",
-            "deadline": "2026-03-01", 
-            "application_link": "https://example.com",
-            "source_category": "Gov", # Boosts score
-            "effort_level": "Low",
-             "awards_available": "50 Spots",
-            "open_date": "2026-01-01"
-        },
-        {
-            "program_name": "NSF SBIR Phase I",
-            "provider": "National Science Foundation",
-            "country": "USA",
-            "sector_focus": "DeepTech, R&D",
-            "funding_type": "Grant (Non-dilutive)",
-            "funding_amount": "$275,000",
-            "eligibility_summary": "US-based small businesses engaging in R&D.",
-            "deadline": "2026-07-05", 
-            "application_link": "https://seedfund.nsf.gov/",
-            "source_category": "Gov",
-            "effort_level": "High",
-            "awards_available": "300+ Awards",
-            "open_date": "2026-03-15"
-        },
-        {
-            "program_name": "Y Combinator S26",
-            "provider": "Y Combinator",
-            "country": "Global (Remote Friendly)",
-            "sector_focus": "Tech, B2B, Consumer",
-            "funding_type": "Equity ($125k for 7%)",
-            "funding_amount": "$500,000",
-            "eligibility_summary": "Early stage startups.",
-            "deadline": "2026-04-15", 
-            "application_link": "https://www.ycombinator.com/apply",
-            "source_category": "Accelerator",
-            "effort_level": "Medium",
-            "awards_available": "250 Cohort Seats",
-            "open_date": "2026-01-15"
-        },
-        {
-            "program_name": "UNICEF Innovation Fund",
-            "provider": "UNICEF",
-            "country": "Global (Emerging Markets)",
-            "sector_focus": "Social Impact, Open Source",
-            "funding_type": "Grant",
-            "funding_amount": "$100,000 (0% Equity)",
-            "eligibility_summary": "Open source technology for children.",
-            "deadline": "2026-08-01", 
-            "application_link": "https://www.unicefinnovationfund.org/",
-            "source_category": "Non-Profit",
-            "effort_level": "High",
-            "awards_available": "Varies",
-            "open_date": "2026-06-01"
-        },
-        {
-            "program_name": "Thiel Fellowship",
-            "provider": "Thiel Foundation",
-            "country": "Global",
-            "sector_focus": "Builders",
-            "funding_type": "Grant",
-            "funding_amount": "$100,000",
-            "eligibility_summary": "Under 23, drop out of school.",
-            "deadline": "Rolling", 
-            "application_link": "https://thielfellowship.org/",
-            "source_category": "Private",
-            "effort_level": "Medium",
-            "awards_available": "20 Fellows",
-            "open_date": "Rolling"
-        },
-        {
-            "program_name": "Epic Games MegaGrants",
-            "provider": "Epic Games",
-            "country": "Global",
-            "sector_focus": "Gaming, 3D, Creative",
-            "funding_type": "Grant",
-            "funding_amount": "$5,000 - $500,000",
-            "eligibility_summary": "Creators using Unreal Engine or open source 3D content.",
-            "deadline": "Rolling", 
-            "application_link": "https://www.unrealengine.com/en-US/megagrants",
-            "source_category": "Private",
-            "effort_level": "Medium",
-            "awards_available": "Rolling Basis",
-            "open_date": "Rolling"
-        },
-        {
-            "program_name": "Reach Capital EdTech Fellowship",
-            "provider": "Reach Capital",
-            "country": "USA / Global",
-            "sector_focus": "EdTech, Learning",
-            "funding_type": "Equity",
-            "funding_amount": "$150,000",
-            "eligibility_summary": "Founders building the future of learning.",
-            "deadline": "2026-05-20", 
-            "application_link": "https://reachcapital.com",
-            "source_category": "VC",
-            "effort_level": "High",
-            "awards_available": "10 Teams",
-            "open_date": "2026-02-01"
-        },
-        {
-            "program_name": "Google for Startups: AI Fund",
-            "provider": "Google",
-            "country": "Europe / Israel",
-            "sector_focus": "AI, Cloud, Data",
-            "funding_type": "Equity-Free Support",
-            "funding_amount": "$350,000 (Cloud Credits)",
-            "eligibility_summary": "AI-first startups.",
-            "deadline": "2026-04-01", 
-            "application_link": "https://campus.co/",
-            "source_category": "Private",
-            "effort_level": "Low",
-            "awards_available": "20 Startups",
-            "open_date": "2026-01-20"
-        },
-        {
-            "program_name": "a16z GAMES SPEEDRUN",
-            "provider": "Andreessen Horowitz",
-            "country": "Global",
-            "sector_focus": "Gaming, Web3",
-            "funding_type": "Equity ($500k)",
-            "funding_amount": "$500,000",
-            "eligibility_summary": "High potential gaming startups.",
-            "deadline": "2026-05-01", 
-            "application_link": "https://a16z.com/speedrun/",
-            "source_category": "VC",
-            "effort_level": "High",
-            "awards_available": "40 Teams",
-            "open_date": "2026-03-01"
-        },
-        {
-            "program_name": "Apple Entrepreneur Camp",
-            "provider": "Apple",
-            "country": "Global",
-            "sector_focus": "App Dev, iOS",
-            "funding_type": "Mentorship + Hardware",
-            "funding_amount": "Unknown",
-            "eligibility_summary": "Underrepresented founders building apps.",
-            "deadline": "2026-09-01", 
-            "application_link": "https://developer.apple.com/entrepreneur-camp/",
-            "source_category": "Corporate",
-            "effort_level": "Medium",
-            "awards_available": "Varies",
-            "open_date": "Rolling"
-        },
-        {
-            "program_name": "Google Play Indie Games Fund",
-            "provider": "Google Play",
-            "country": "Latin America",
-            "sector_focus": "App Dev, Gaming",
-            "funding_type": "Grant + Support",
-            "funding_amount": "$2,000,000 Fund",
-            "eligibility_summary": "Indie game studios and app developers.",
-            "deadline": "2026-08-15", 
-            "application_link": "https://developer.android.com/distribute/google-play/indie-games-fund",
-            "source_category": "Corporate",
-            "effort_level": "High",
-            "awards_available": "10 Studios",
-            "open_date": "2026-06-01"
-        },
-        {
-            "program_name": "Apple Entrepreneur Camp",
-            "provider": "Apple",
-            "country": "Global",
-            "sector_focus": "App Dev, iOS",
-            "funding_type": "Mentorship + Hardware",
-            "funding_amount": "Unknown",
-            "eligibility_summary": "Underrepresented founders building apps.",
-            "deadline": "2026-09-01", 
-            "application_link": "https://developer.apple.com/entrepreneur-camp/",
-            "source_category": "Corporate",
-            "effort_level": "Medium",
-            "awards_available": "Varies",
-            "open_date": "Rolling"
-        },
-        {
-            "program_name": "Google Play Indie Games Fund",
-            "provider": "Google Play",
-            "country": "Latin America",
-            "sector_focus": "App Dev, Gaming",
-            "funding_type": "Grant + Support",
-            "funding_amount": "$2,000,000 Fund",
-            "eligibility_summary": "Indie game studios and app developers.",
-            "deadline": "2026-08-15", 
-            "application_link": "https://developer.android.com/distribute/google-play/indie-games-fund",
-            "source_category": "Corporate",
-            "effort_level": "High",
-            "awards_available": "10 Studios",
-            "open_date": "2026-06-01"
-        }
-    ]
-    
-    findings_count = len(potential_findings)
-    added_count = 0
-    
-    for grant in potential_findings:
-        result = manager.add_grant(grant)
-        if result == "ADDED":
-            print(f"✨ [NEW] {grant['program_name']} (Score: {grant.get('relevance_score')})")
-            added_count += 1
-        elif result == "UPDATED":
-            print(f"📝 [UPDATE] {grant['program_name']}")
-            added_count += 1 
+# Mock Findings (served by the default 'simulation' source when no sources.json exists)
+MOCK_FINDINGS = [
+    {
+        "program_name": "OpenAI Residency",
+        "provider": "OpenAI",
+        "country": "US (Remote Friendly)",
+        "sector_focus": "AI, ML Research",
+        "funding_type": "Salary + Equity",
+        "funding_amount": "$210,000 / year",
+        "eligibility_summary": "Exceptional researchers.",
+        "deadline": "2026-06-01", 
+        "application_link": "https://openai.com/careers",
+        "source_category": "Private",
+        "effort_level": "High"
+    },
+    {
+        "program_name": "Fast Track High Score Grant",
+        "provider": "Test Provider",
+        "country": "Global",
+        "sector_focus": "General",
+        "funding_type": "Grant",
+        "funding_amount": "$100,000",
+        "eligibility_summary": "Open to all.",
+        "deadline": "2026-03-01", 
+        "application_link": "https://example.com",
+        "source_category": "Gov", # Boosts score
+        "effort_level": "Low",
+         "awards_available": "50 Spots",
+        "open_date": "2026-01-01"
+    },
+    {
+        "program_name": "NSF SBIR Phase I",
+        "provider": "National Science Foundation",
+        "country": "USA",
+        "sector_focus": "DeepTech, R&D",
+        "funding_type": "Grant (Non-dilutive)",
+        "funding_amount": "$275,000",
+        "eligibility_summary": "US-based small businesses engaging in R&D.",
+        "deadline": "2026-07-05", 
+        "application_link": "https://seedfund.nsf.gov/",
+        "source_category": "Gov",
+        "effort_level": "High",
+        "awards_available": "300+ Awards",
+        "open_date": "2026-03-15"
+    },
+    {
+        "program_name": "Y Combinator S26",
+        "provider": "Y Combinator",
+        "country": "Global (Remote Friendly)",
+        "sector_focus": "Tech, B2B, Consumer",
+        "funding_type": "Equity ($125k for 7%)",
+        "funding_amount": "$500,000",
+        "eligibility_summary": "Early stage startups.",
+        "deadline": "2026-04-15", 
+        "application_link": "https://www.ycombinator.com/apply",
+        "source_category": "Accelerator",
+        "effort_level": "Medium",
+        "awards_available": "250 Cohort Seats",
+        "open_date": "2026-01-15"
+    },
+    {
+        "program_name": "UNICEF Innovation Fund",
+        "provider": "UNICEF",
+        "country": "Global (Emerging Markets)",
+        "sector_focus": "Social Impact, Open Source",
+        "funding_type": "Grant",
+        "funding_amount": "$100,000 (0% Equity)",
+        "eligibility_summary": "Open source technology for children.",
+        "deadline": "2026-08-01", 
+        "application_link": "https://www.unicefinnovationfund.org/",
+        "source_category": "Non-Profit",
+        "effort_level": "High",
+        "awards_available": "Varies",
+        "open_date": "2026-06-01"
+    },
+    {
+        "program_name": "Thiel Fellowship",
+        "provider": "Thiel Foundation",
+        "country": "Global",
+        "sector_focus": "Builders",
+        "funding_type": "Grant",
+        "funding_amount": "$100,000",
+        "eligibility_summary": "Under 23, drop out of school.",
+        "deadline": "Rolling", 
+        "application_link": "https://thielfellowship.org/",
+        "source_category": "Private",
+        "effort_level": "Medium",
+        "awards_available": "20 Fellows",
+        "open_date": "Rolling"
+    },
+    {
+        "program_name": "Epic Games MegaGrants",
+        "provider": "Epic Games",
+        "country": "Global",
+        "sector_focus": "Gaming, 3D, Creative",
+        "funding_type": "Grant",
+        "funding_amount": "$5,000 - $500,000",
+        "eligibility_summary": "Creators using Unreal Engine or open source 3D content.",
+        "deadline": "Rolling", 
+        "application_link": "https://www.unrealengine.com/en-US/megagrants",
+        "source_category": "Private",
+        "effort_level": "Medium",
+        "awards_available": "Rolling Basis",
+        "open_date": "Rolling"
+    },
+    {
+        "program_name": "Reach Capital EdTech Fellowship",
+        "provider": "Reach Capital",
+        "country": "USA / Global",
+        "sector_focus": "EdTech, Learning",
+        "funding_type": "Equity",
+        "funding_amount": "$150,000",
+        "eligibility_summary": "Founders building the future of learning.",
+        "deadline": "2026-05-20", 
+        "application_link": "https://reachcapital.com",
+        "source_category": "VC",
+        "effort_level": "High",
+        "awards_available": "10 Teams",
+        "open_date": "2026-02-01"
+    },
+    {
+        "program_name": "Google for Startups: AI Fund",
+        "provider": "Google",
+        "country": "Europe / Israel",
+        "sector_focus": "AI, Cloud, Data",
+        "funding_type": "Equity-Free Support",
+        "funding_amount": "$350,000 (Cloud Credits)",
+        "eligibility_summary": "AI-first startups.",
+        "deadline": "2026-04-01", 
+        "application_link": "https://campus.co/",
+        "source_category": "Private",
+        "effort_level": "Low",
+        "awards_available": "20 Startups",
+        "open_date": "2026-01-20"
+    },
+    {
+        "program_name": "a16z GAMES SPEEDRUN",
+        "provider": "Andreessen Horowitz",
+        "country": "Global",
+        "sector_focus": "Gaming, Web3",
+        "funding_type": "Equity ($500k)",
+        "funding_amount": "$500,000",
+        "eligibility_summary": "High potential gaming startups.",
+        "deadline": "2026-05-01", 
+        "application_link": "https://a16z.com/speedrun/",
+        "source_category": "VC",
+        "effort_level": "High",
+        "awards_available": "40 Teams",
+        "open_date": "2026-03-01"
+    },
+    {
+        "program_name": "Apple Entrepreneur Camp",
+        "provider": "Apple",
+        "country": "Global",
+        "sector_focus": "App Dev, iOS",
+        "funding_type": "Mentorship + Hardware",
+        "funding_amount": "Unknown",
+        "eligibility_summary": "Underrepresented founders building apps.",
+        "deadline": "2026-09-01", 
+        "application_link": "https://developer.apple.com/entrepreneur-camp/",
+        "source_category": "Corporate",
+        "effort_level": "Medium",
+        "awards_available": "Varies",
+        "open_date": "Rolling"
+    },
+    {
+        "program_name": "Google Play Indie Games Fund",
+        "provider": "Google Play",
+        "country": "Latin America",
+        "sector_focus": "App Dev, Gaming",
+        "funding_type": "Grant + Support",
+        "funding_amount": "$2,000,000 Fund",
+        "eligibility_summary": "Indie game studios and app developers.",
+        "deadline": "2026-08-15", 
+        "application_link": "https://developer.android.com/distribute/google-play/indie-games-fund",
+        "source_category": "Corporate",
+        "effort_level": "High",
+        "awards_available": "10 Studios",
+        "open_date": "2026-06-01"
+    },
+    {
+        "program_name": "Apple Entrepreneur Camp",
+        "provider": "Apple",
+        "country": "Global",
+        "sector_focus": "App Dev, iOS",
+        "funding_type": "Mentorship + Hardware",
+        "funding_amount": "Unknown",
+        "eligibility_summary": "Underrepresented founders building apps.",
+        "deadline": "2026-09-01", 
+        "application_link": "https://developer.apple.com/entrepreneur-camp/",
+        "source_category": "Corporate",
+        "effort_level": "Medium",
+        "awards_available": "Varies",
+        "open_date": "Rolling"
+    },
+    {
+        "program_name": "Google Play Indie Games Fund",
+        "provider": "Google Play",
+        "country": "Latin America",
+        "sector_focus": "App Dev, Gaming",
+        "funding_type": "Grant + Support",
+        "funding_amount": "$2,000,000 Fund",
+        "eligibility_summary": "Indie game studios and app developers.",
+        "deadline": "2026-08-15", 
+        "application_link": "https://developer.android.com/distribute/google-play/indie-games-fund",
+        "source_category": "Corporate",
+        "effort_level": "High",
+        "awards_available": "10 Studios",
+        "open_date": "2026-06-01"
+    }
+]
+
+# --- SOURCE ADAPTERS ---
+class SourceAdapter(abc.ABC):
+    """
+    A place grants come from. Subclasses implement parse(); fetch() does a
+    plain HTTP GET with a timeout. run() is called from a worker thread and
+    must not touch GrantManager.
+    """
+    def __init__(self, name, url=None, timeout=FETCH_TIMEOUT, defaults=None):
+        self.name = name
+        self.url = url
+        self.timeout = timeout
+        self.defaults = defaults or {}  # Fields stamped onto every grant from this source
+
+    @property
+    def host(self):
+        return urllib.parse.urlsplit(self.url).netloc if self.url else 'local'
+
+    def fetch(self):
+        req = urllib.request.Request(self.url, headers={'User-Agent': USER_AGENT})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            return resp.read()
+
+    @abc.abstractmethod
+    def parse(self, body):
+        """The grants (plain dicts) in a fetched body."""
+
+    def run(self, cache=None, force=False):
+        """
+        Returns this source's grants. With a FetchCache, returns None when the
+        source is unchanged since the last run (304 or same body hash), so it
+        is neither parsed nor scored; force=True re-parses it anyway.
+        """
+        if cache is not None and self.url:
+            body, changed = cache.fetch(self.url, self.timeout, {'User-Agent': USER_AGENT})
+            if not changed and not force:
+                return None
         else:
-            print(f"⚠️ [SKIP] {grant['program_name']} (Duplicate)")
-    
+            body = self.fetch()
+        return [dict(self.defaults, **g) for g in self.parse(body)]
+
+class StaticSource(SourceAdapter):
+    """In-memory findings (the simulation list, or fixtures)."""
+    def __init__(self, name, findings, **kwargs):
+        super().__init__(name, **kwargs)
+        self.findings = findings
+
+    def fetch(self):
+        return self.findings
+
+    def parse(self, body):
+        # Copies, because ingest enriches grants in place
+        return [dict(g) for g in body]
+
+class JSONFeedSource(SourceAdapter):
+    """A JSON list of grants, or an object with a 'grants' list. field_map renames feed keys."""
+    def __init__(self, name, url, field_map=None, **kwargs):
+        super().__init__(name, url, **kwargs)
+        self.field_map = field_map or {}
+
+    def parse(self, body):
+        data = json.loads(body)
+        if isinstance(data, dict):
+            data = data.get('grants', [])
+        return [{self.field_map.get(k, k): v for k, v in item.items()} for item in data]
+
+class RSSFeedSource(SourceAdapter):
+    """RSS 2.0 <item>s: title -> program_name, link -> application_link, description -> eligibility_summary."""
+    def parse(self, body):
+        root = ElementTree.fromstring(body)
+        channel = root.find('channel')
+        provider = channel.findtext('title', '') if channel is not None else ''
+        grants = []
+        for item in root.iter('item'):
+            grants.append({
+                "program_name": (item.findtext('title') or '').strip(),
+                "provider": provider,
+                "application_link": (item.findtext('link') or '').strip(),
+                "eligibility_summary": (item.findtext('description') or '').strip(),
+            })
+        return grants
+
+SOURCE_TYPES = {'json': JSONFeedSource, 'rss': RSSFeedSource}
+
+def load_sources(path=SOURCES_FILE, errors=None):
+    """
+    Builds adapters from sources.json, e.g.
+      [{"type": "json", "name": "gov-feed", "url": "https://...", "defaults": {"source_category": "Gov"}}]
+    Falls back to the simulation findings when the file does not exist. A
+    broken file or entry is reported (printed, and appended to errors) and
+    skipped; the valid entries still run.
+    """
+    if not os.path.exists(path):
+        return [StaticSource('simulation', MOCK_FINDINGS)]
+    errors = [] if errors is None else errors
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        if not isinstance(config, list):
+            raise ValueError("expected a list of sources")
+    except ValueError as e:
+        print(f"❌ Could not load {path}: {e}")
+        errors.append(f"{path}: {e}")
+        return []
+    sources = []
+    for i, entry in enumerate(config):
+        try:
+            entry = dict(entry)
+            kind = entry.pop('type', None)
+            if kind not in SOURCE_TYPES:
+                raise ValueError(f"unknown type {kind!r} (expected one of {', '.join(SOURCE_TYPES)})")
+            sources.append(SOURCE_TYPES[kind](**entry))
+        except (TypeError, ValueError) as e:
+            print(f"❌ Skipping source #{i + 1} in {path}: {e}")
+            errors.append(f"{path} #{i + 1}: {e}")
+    return sources
+
+# --- CLASS: FETCH CACHE ---
+class FetchCache:
+    """
+    On-disk HTTP cache for scan sources. Bodies are stored content-addressed
+    (by SHA-256) under CACHE_DIR with their ETag/Last-Modified, and revalidated
+    with conditional requests. fetch() reports whether the body changed so the
+    pipeline can skip unchanged sources entirely.
+
+    A fetched response is only staged; the pipeline commit()s it once that
+    source's grants are ingested and discard()s it if parsing or ingest fails
+    (or never gets to it, after SCAN_TIMEOUT), so a failed source is fetched
+    and ingested in full next run rather than skipped as unchanged. The index
+    is only written by save(), which main() calls after the grants are saved:
+    if a run dies mid-way, the next run sees the sources as changed too.
+    """
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, 'index.json')
+        self.lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0, "unchanged": 0, "evicted": 0}
+        self.entries = {}  # url -> {etag, last_modified, sha, size, last_used}
+        self.staged = {}   # url -> entry fetched this run, not yet committed
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (ValueError, OSError):
+                self.entries = {}  # A broken cache only costs a full refetch
+
+    def body_path(self, sha):
+        return os.path.join(self.cache_dir, sha + '.body')
+
+    def read_body(self, entry):
+        path = self.body_path(entry['sha'])
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    @instrumented('scan.cache_fetch')
+    def fetch(self, url, timeout, headers=None):
+        """Returns (body, changed)."""
+        with self.lock:
+            entry = self.entries.get(url)
+        body = self.read_body(entry) if entry else None
+
+        req_headers = dict(headers or {})
+        if entry and body is not None:
+            if entry.get('etag'): req_headers['If-None-Match'] = entry['etag']
+            if entry.get('last_modified'): req_headers['If-Modified-Since'] = entry['last_modified']
+        req = urllib.request.Request(url, headers=req_headers)
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                new_body = resp.read()
+                etag = resp.headers.get('ETag')
+                last_modified = resp.headers.get('Last-Modified')
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and body is not None:
+                with self.lock:
+                    entry['last_used'] = time.time()
+                    self.stats['hits'] += 1
+                    self.stats['not_modified'] += 1
+                return body, False
+            raise
+
+        sha = hashlib.sha256(new_body).hexdigest()
+        changed = not (entry and entry['sha'] == sha)
+        if changed:
+            if not os.path.exists(self.cache_dir): os.makedirs(self.cache_dir, exist_ok=True)
+            atomic_write_bytes(self.body_path(sha), new_body)
+        with self.lock:
+            self.staged[url] = {"etag": etag, "last_modified": last_modified, "sha": sha,
+                                "size": len(new_body), "last_used": time.time()}
+            if changed:
+                self.stats['misses'] += 1
+            else:
+                self.stats['hits'] += 1
+                self.stats['unchanged'] += 1
+        return new_body, changed
+
+    def commit(self, url):
+        """The source's grants are stored: remember this response, so an unchanged one is skipped next time."""
+        with self.lock:
+            entry = self.staged.pop(url, None)
+            if entry is not None:
+                self.entries[url] = entry
+
+    def discard(self, url):
+        with self.lock:
+            self.staged.pop(url, None)
+
+    def save(self):
+        """Evicts least-recently-used bodies past max_bytes, drops orphans and writes the index."""
+        with self.lock:
+            self.staged.clear()  # Whatever was not committed by now failed or finished too late
+            total = 0
+            for url, entry in sorted(self.entries.items(), key=lambda kv: -kv[1]['last_used']):
+                total += entry['size']
+                if total > self.max_bytes:
+                    del self.entries[url]
+                    self.stats['evicted'] += 1
+            live = {entry['sha'] for entry in self.entries.values()}
+            if not os.path.exists(self.cache_dir): os.makedirs(self.cache_dir, exist_ok=True)
+            for filename in os.listdir(self.cache_dir):
+                if filename.endswith('.body') and filename[:-len('.body')] not in live:
+                    os.remove(os.path.join(self.cache_dir, filename))
+            atomic_write_text(self.index_path, json.dumps(self.entries))
+
+# --- CLASS: SCAN PIPELINE ---
+class ScanPipeline:
+    """
+    Fetches all sources concurrently on a thread pool, with at most
+    per_host_limit requests in flight per host. Each source's grants are
+    ingested into the manager (on the calling thread) as soon as it finishes,
+    so a slow or failing source never holds up the rest. Failures are
+    collected as error strings for Auditor.log_run. With a FetchCache,
+    unchanged sources are skipped before parsing.
+    """
+    def __init__(self, manager, sources, max_workers=SCAN_MAX_WORKERS,
+                 per_host_limit=SCAN_PER_HOST_LIMIT, scan_timeout=SCAN_TIMEOUT, cache=None, force=False):
+        self.manager = manager
+        self.sources = sources
+        self.cache = cache
+        self.force = force
+        self.unchanged = []  # Names of sources skipped by the cache
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.scan_timeout = scan_timeout
+        self.host_slots = {}
+        self.lock = threading.Lock()
+
+    def slot(self, host):
+        with self.lock:
+            if host not in self.host_slots:
+                self.host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self.host_slots[host]
+
+    @instrumented('scan.fetch_source')
+    def fetch_source(self, source):
+        with self.slot(source.host):
+            return source.run(cache=self.cache, force=self.force)
+
+    def settle(self, source, ingested):
+        """Commits the source's cached response once its grants are in the catalog, else drops it."""
+        if self.cache is not None and source.url:
+            if ingested: self.cache.commit(source.url)
+            else: self.cache.discard(source.url)
+
+    @instrumented('scan.pipeline')
+    def run(self, on_result=None):
+        """Returns (scanned, added, errors). on_result(grant, result) is called per ingested grant."""
+        scanned, added, errors = 0, 0, []
+        if not self.sources:
+            return scanned, added, errors
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=min(self.max_workers, len(self.sources)))
+        futures = {pool.submit(self.fetch_source, src): src for src in self.sources}
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=self.scan_timeout):
+                source = futures[future]
+                try:
+                    grants = future.result()
+                except Exception as e:
+                    self.settle(source, False)
+                    errors.append(f"{source.name}: {type(e).__name__}: {e}")
+                    print(f"❌ Source failed: {source.name} ({e})")
+                    continue
+                if grants is None:
+                    self.settle(source, True)
+                    self.unchanged.append(source.name)
+                    continue
+                scanned += len(grants)
+                try:
+                    results = self.manager.add_grants(grants)
+                except Exception as e:
+                    # Grants before the bad one are kept; the rest come back on the next (uncached) fetch
+                    self.settle(source, False)
+                    errors.append(f"{source.name}: ingest failed: {type(e).__name__}: {e}")
+                    print(f"❌ Could not ingest {source.name} ({e})")
+                    continue
+                self.settle(source, True)
+                for grant, result in zip(grants, results):
+                    if result in ("ADDED", "UPDATED"): added += 1
+                    if on_result: on_result(grant, result)
+        except concurrent.futures.TimeoutError:
+            for future, source in futures.items():
+                if not future.done():
+                    errors.append(f"{source.name}: timed out after {self.scan_timeout}s")
+                    print(f"⏱️ Source timed out: {source.name}")
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+        return scanned, added, errors
+
+def report_result(grant, result):
+    if result == "ADDED":
+        print(f"✨ [NEW] {grant['program_name']} (Score: {grant.get('relevance_score')})")
+    elif result == "UPDATED":
+        print(f"📝 [UPDATE] {grant['program_name']}")
+    else:
+        print(f"⚠️ [SKIP] {grant['program_name']} (Duplicate)")
+
+def ai_scan(manager, sources=None, cache=None):
+    """Runs every source through the scan pipeline, then the daily checks. Returns (scanned, added, errors)."""
+    print("\n🔍 AI Agent Initialized (v2.1 - Alerts Enabled)...")
+    errors = []
+    sources = load_sources(errors=errors) if sources is None else sources
+    pipeline = ScanPipeline(manager, sources, cache=cache)
+    scanned, added, scan_errors = pipeline.run(on_result=report_result)
+    errors.extend(scan_errors)
+    for name in pipeline.unchanged:
+        print(f"💤 [CACHED] {name} unchanged since last scan")
+
     # Run daily checks
     manager.run_deadline_check()
-            
-    return findings_count, added_count
 
-def main():
+    return scanned, added, errors
+
+def run_scan_cycle(manager, auditor, timer=None, cache=None):
+    """One scan -> save -> alerts cycle, logged with per-stage timings and run metrics."""
+    timer = timer or StageTimer()
+    scored_before = manager.scorer.scored
+    bytes_before = manager.bytes_written + manager.exporter.bytes_written
+    alerts_before = dict(manager.alerter.metrics)
+    cache = cache or FetchCache()
+    with timer.stage('scan'):
+        scanned, added, errors = ai_scan(manager, cache=cache)
+    with timer.stage('rescore'):
+        rescored = manager.rescore_grants()  # Urgency drifts daily, even for grants no source touched
+    with timer.stage('save'):
+        saved = manager.save_grants()  # No-op unless something changed (added, updated or re-scored)
+        cache.save()
+    ranking = None
+    try:
+        matchers = load_profiles()
+    except ValueError as e:  # A broken profiles.json must not cost the run its alerts and log entry
+        print(f"❌ Could not load {PROFILES_FILE}: {e}")
+        errors.append(f"{PROFILES_FILE}: {e}")
+        matchers = []
+    if matchers:
+        with timer.stage('rank'):
+            ranking = run_ranking(manager, matchers)
+    with timer.stage('alerts'):
+        manager.alerter.flush()
+    return auditor.log_run(scanned, added, errors=errors, metrics={
+        "wall_time": round(sum(timer.timings.values()), 4),
+        "stages": timer.timings,
+        "catalog_size": len(manager.grants),
+        "saved": saved,
+        "rescored": rescored,
+        "grants_scored": manager.scorer.scored - scored_before,
+        "bytes_written": manager.bytes_written + manager.exporter.bytes_written - bytes_before,
+        "cache": cache.stats,
+        "alerts": manager.alerter.metrics_since(alerts_before),
+        **({"ranking": ranking} if ranking else {}),
+        **({"profile": INSTRUMENTS.snapshot()} if INSTRUMENTS.enabled else {}),
+    })
+
+def run_ranking(manager, matchers, show=0):
+    """Ranks, exports and alerts for every profile; prints the top `show` per profile. Returns run-log metrics."""
+    ranker = ProfileRanker(matchers, manager.scorer)
+    rankings = ranker.rank(manager.grants)
+    written = ranker.export(rankings)
+    decisions = ranker.alert(rankings, manager.alerter)
+    for name, ranked in rankings.items():
+        if show:
+            print(f"\n🎯 {name} (top {len(ranked)})")
+            for rank, (score, priority, g) in enumerate(ranked[:show], 1):
+                print(f"  {rank:>3}. {score:>3} {priority:<7}{g['program_name']} ({g.get('provider', '')})")
+    print(f"🎯 Ranked {len(manager.grants)} grants for {len(rankings)} profiles "
+          f"({written} rankings written, {len(decisions)} alerts).")
+    return {"profiles": len(rankings), "files_written": written, "alerts": len(decisions)}
+
+def run_dedup(manager, threshold, apply):
+    pairs = manager.dedup_catalog(threshold, apply=apply)
+    for dropped, kept, similarity in pairs:
+        print(f"🧬 {similarity:.0%}  {dropped['program_name']} ({dropped['provider']})  →  {kept['program_name']} ({kept['provider']})")
+    if not pairs:
+        print("✅ No near duplicates found.")
+    elif apply:
+        print(f"🧹 Removed {len(pairs)} duplicates. Total grants: {len(manager.grants)}")
+    else:
+        print(f"ℹ️ {len(pairs)} duplicates found. Re-run with --apply to remove them.")
+
+def list_backups(store):
+    entries = store.entries()
+    if not entries:
+        print("No backups yet.")
+        return
+    print(f"{'taken':<21}{'snapshot':<14}{'grants':>8}{'size':>12}{'stored':>10}")
+    for e in entries:
+        grants = '?' if e.get('grants') is None else e['grants']
+        print(f"{e['taken']:<21}{e['sha256'][:12]:<14}{grants:>8}{e['bytes']:>12,}{e['stored_bytes']:>10,}")
+    unique = {e['sha256']: e['stored_bytes'] for e in entries}
+    print(f"\n{len(entries)} snapshots, {len(unique)} distinct, {sum(unique.values()):,} bytes on disk")
+
+def restore_backup(date):
+    try:
+        entry = BackupStore().restore(date)
+    except ValueError as e:  # Bad date, corrupt backup or index
+        print(f"❌ Could not restore: {e}")
+        sys.exit(1)
+    if entry is None:
+        print(f"❌ No backup taken on or before {date}.")
+        sys.exit(1)
+    # The restored snapshot is the whole catalog: drop the journal/database and regenerate the dashboard data
+    manager = GrantManager()
+    manager.storage.reset_from_file()
+    manager.load_grants()
+    manager.exporter.export(manager.grants, manager.saved_fingerprint)
+    print(f"♻️ Restored {len(manager.grants)} grants from the backup taken {entry['taken']}.")
+
+# --- CLASS: AGENT DAEMON ---
+class AgentDaemon:
+    """
+    Long-running agent (--daemon). The catalog, its indexes, the fetch cache
+    and the alert workers stay in memory, and a timer runs the jobs: scan
+    (DAEMON_SCAN_INTERVAL), re-score + deadline alerts, save (only when
+    something changed) and a watch on grants.js that reloads it when it is
+    changed from outside (a git pull, --restore, a hand edit); unsaved
+    in-memory changes are dropped in that case, as the file wins. The file is
+    also checked before every job, and in journal mode it is not reloaded
+    while the journal holds saved changes that grants.js lacks.
+
+    Jobs run one at a time on the calling thread. A local HTTP server answers
+    GET /health and GET /stats from a snapshot refreshed after every job, so
+    it never touches the catalog while a job is changing it. SIGTERM/SIGINT
+    stop the loop after the current job; pending changes are saved on exit.
+    """
+    def __init__(self, manager, auditor, scan_interval=DAEMON_SCAN_INTERVAL, deadline_interval=DAEMON_DEADLINE_INTERVAL,
+                 save_interval=DAEMON_SAVE_INTERVAL, watch_interval=DAEMON_WATCH_INTERVAL,
+                 host=DAEMON_HOST, port=DAEMON_PORT):
+        self.manager = manager
+        self.auditor = auditor
+        self.cache = FetchCache()
+        self.host = host
+        self.port = port
+        self.stopping = threading.Event()
+        self.server = None
+        self.started = time.time()
+        self.running = None  # Name of the job in progress
+        self.stats = {}
+        now = time.monotonic()
+        # Scans and deadline checks run right away, like an --auto run would
+        self.watch_job = self.job('watch', watch_interval, self.check_grants_file, now + watch_interval)
+        self.jobs = [self.watch_job,
+                     self.job('save', save_interval, self.save, now + save_interval),
+                     self.job('deadlines', deadline_interval, self.check_deadlines, now),
+                     self.job('scan', scan_interval, self.scan, now)]
+
+    @staticmethod
+    def job(name, interval, fn, next_due):
+        return {"name": name, "interval": interval, "fn": fn, "next_due": next_due,
+                "runs": 0, "last_run": None, "last_seconds": None, "last_error": None}
+
+    # Jobs
+    def scan(self):
+        self.cache.stats = dict.fromkeys(self.cache.stats, 0)  # Per-scan numbers in the run log
+        run_scan_cycle(self.manager, self.auditor, cache=self.cache)
+
+    def check_deadlines(self):
+        rescored = self.manager.rescore_grants()
+        self.manager.run_deadline_check()
+        self.manager.alerter.flush()
+        if rescored:
+            print(f"🔁 Re-scored {rescored} grants.")
+
+    def save(self):
+        if self.manager.dirty:
+            self.manager.save_grants()
+
+    def check_grants_file(self):
+        storage = self.manager.storage
+        if not storage.snapshot_changed():
+            return
+        stamp = storage.stat_snapshot()
+        storage.snapshot_stamp = stamp  # Seen, so a broken or conflicting file is reported once, not every tick
+        if stamp is None:
+            print(f"⚠️ {storage.grants_file} was removed; keeping the in-memory catalog (the next save rewrites it).")
+            return
+        # Parse it before dropping anything: a half-written or broken file must not replace the catalog
+        for _ in iter_grants_file(storage.grants_file):
+            pass
+        unmerged = storage.unmerged_bytes()
+        if unmerged:
+            # reset_from_file would delete saved changes that only the journal has
+            raise ValueError(f"{storage.grants_file} changed on disk, but the journal holds {unmerged} bytes of saved "
+                             f"changes not in it; not reloading (compact or remove the journal, then touch the file)")
+        unsaved = len(self.manager.dirty)
+        storage.reset_from_file()
+        self.manager.load_grants()
+        print(f"📂 {storage.grants_file} changed on disk: reloaded {len(self.manager.grants)} grants"
+              + (f" ({unsaved} unsaved changes discarded)." if unsaved else "."))
+        self.manager.save_grants()  # Nothing to write back, but data/ is re-exported from the new file
+
+    def run_job(self, job):
+        if job is not self.watch_job and self.manager.storage.snapshot_changed():
+            self.run_job(self.watch_job)  # Pick up an outside edit before this job can save over it
+        self.running = job['name']
+        started = time.perf_counter()
+        error = None
+        try:
+            job['fn']()
+        except Exception as e:  # A failing job must not take the daemon down; it is retried next interval
+            error = f"{type(e).__name__}: {e}"
+            print(f"❌ Daemon job {job['name']} failed: {error}")
+        finally:
+            self.running = None
+            job['runs'] += 1
+            job['last_run'] = datetime.now().isoformat(timespec='seconds')
+            job['last_seconds'] = round(time.perf_counter() - started, 4)
+            job['last_error'] = error
+            job['next_due'] = time.monotonic() + job['interval']
+        self.refresh_stats()
+
+    # Stats
+    def refresh_stats(self):
+        manager = self.manager
+        self.stats = {
+            "grants": len(manager.grants),
+            "priority": manager.count_by('priority'),
+            "status": manager.count_by('status'),
+            "expiring_7_days": len(manager.deadlines.expiring_within(7)),
+            "expired_open": len(manager.deadlines.expired()),
+            "unsaved_changes": len(manager.dirty),
+            "storage": manager.storage_mode,
+            "near_duplicate_index": None if manager.near_dups is None else len(manager.near_dups.signatures),
+            "alerts": dict(manager.alerter.metrics,
+                           pending=len(manager.alerter.outbox.pending) if manager.alerter.outbox else 0),
+            "fetch_cache": dict(self.cache.stats, entries=len(self.cache.entries)),
+            "grants_scored": manager.scorer.scored,
+            "bytes_written": manager.bytes_written + manager.exporter.bytes_written,
+            "updated": datetime.now().isoformat(timespec='seconds'),
+        }
+
+    def health(self):
+        now = time.monotonic()
+        jobs = {j['name']: {"runs": j['runs'], "last_run": j['last_run'], "last_seconds": j['last_seconds'],
+                            "last_error": j['last_error'], "next_in": round(max(0, j['next_due'] - now), 1)}
+                for j in self.jobs}
+        return {"status": "degraded" if any(j['last_error'] for j in jobs.values()) else "ok",
+                "pid": os.getpid(), "uptime": round(time.time() - self.started, 1),
+                "running": self.running, "jobs": jobs}
+
+    def start_server(self):
+        daemon = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split('?', 1)[0].rstrip('/')
+                routes = {'/health': daemon.health, '/stats': lambda: daemon.stats}
+                if path not in routes:
+                    self.send_error(404)
+                    return
+                body = json.dumps(routes[path](), indent=2).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Health checks would flood the console
+
+        self.server = http.server.ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.port = self.server.server_address[1]  # Port 0 picks a free one
+        threading.Thread(target=self.server.serve_forever, name='daemon-http', daemon=True).start()
+
+    def stop(self, *_):
+        self.stopping.set()
+
+    def run(self):
+        self.refresh_stats()
+        self.start_server()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.stop)
+        print(f"🛰️ DAEMON MODE: {len(self.manager.grants)} grants in memory, "
+              f"health/stats on http://{self.host}:{self.port}/ (scan every {self.jobs[3]['interval']}s)")
+        try:
+            while not self.stopping.is_set():
+                job = min(self.jobs, key=lambda j: j['next_due'])
+                wait = job['next_due'] - time.monotonic()
+                if wait > 0:
+                    self.stopping.wait(wait)  # Wakes up early on stop()
+                    continue
+                self.run_job(job)
+        finally:
+            self.shutdown()
+
+    def shutdown(self):
+        print("🛑 Daemon stopping...")
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+        try:
+            self.save()
+        finally:
+            self.manager.alerter.flush()
+            self.manager.backups.wait()
+            self.manager.close_pool()
+            close = getattr(self.manager.storage, 'close', None)
+            if close: close()
+        print("👋 Daemon stopped.")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Intelligent grant agent: scan, score, dedup and alert.")
+    parser.add_argument('--auto', action='store_true', help="headless scan (used by the nightly workflow)")
+    parser.add_argument('--profile', action='store_true',
+                        help="time every stage and print a per-stage breakdown at exit")
+    parser.add_argument('--profile-out', metavar='PATH',
+                        help="also run under cProfile and dump pstats data to PATH (implies --profile)")
+    parser.add_argument('--dedup', action='store_true',
+                        help="report near-duplicate grants already in the catalog, then exit")
+    parser.add_argument('--apply', action='store_true', help="with --dedup: remove the duplicates and save")
+    parser.add_argument('--backups', action='store_true', help="list catalog backups, then exit")
+    parser.add_argument('--restore', metavar='YYYY-MM-DD',
+                        help="restore grants.js from the latest backup taken on or before this date, then exit")
+    parser.add_argument('--rank', action='store_true',
+                        help="rank the catalog for every profile in profiles.json, export and alert, then exit")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running: scheduled scans, deadline checks and saves, with /health and /stats")
+    parser.add_argument('--port', type=int, default=DAEMON_PORT,
+                        help=f"with --daemon: port for /health and /stats on {DAEMON_HOST} (default {DAEMON_PORT})")
+    parser.add_argument('--scan-interval', type=int, default=DAEMON_SCAN_INTERVAL,
+                        help=f"with --daemon: seconds between scans (default {DAEMON_SCAN_INTERVAL})")
+    parser.add_argument('--threshold', type=float, default=NEAR_DUP_THRESHOLD,
+                        help=f"with --dedup: similarity cut-off (default {NEAR_DUP_THRESHOLD})")
+    return parser.parse_args(argv)
+
+def print_profile(profiler=None, profile_out=None):
+    print("\n⏱️ PROFILE (inclusive times)")
+    print(INSTRUMENTS.report())
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(profile_out)
+        print(f"\n📈 cProfile data written to {profile_out} (top 15 by cumulative time):")
+        pstats.Stats(profile_out).sort_stats('cumulative').print_stats(15)
+
+def main(argv=None):
+    args = parse_args(argv)
+    profiler = None
+    if args.profile or args.profile_out:
+        INSTRUMENTS.enable()
+    if args.profile_out:
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        run_agent(args)
+    finally:
+        if INSTRUMENTS.enabled:
+            print_profile(profiler, args.profile_out)
+
+def run_agent(args):
+    if args.backups:
+        list_backups(BackupStore())
+        return
+    if args.restore:
+        restore_backup(args.restore)
+        return
+
     manager = GrantManager()
     auditor = Auditor()
+    timer = StageTimer()
     
-    manager.load_grants()
+    try:
+        with timer.stage('load'):
+            manager.load_grants()
+    except GrantsFileError as e:
+        # Refuse to run: a save on top of an empty catalog would wipe grants.js
+        print(f"❌ Could not load grants: {e}")
+        sys.exit(1)
     
+    if args.dedup:
+        run_dedup(manager, args.threshold, args.apply)
+        return
+
+    if args.rank:
+        try:
+            matchers = load_profiles()
+        except ValueError as e:
+            print(f"❌ Could not load {PROFILES_FILE}: {e}")
+            sys.exit(1)
+        if not matchers:
+            print(f"❌ No profiles: create {PROFILES_FILE} (a list of profiles, see ProfileMatcher).")
+            sys.exit(1)
+        run_ranking(manager, matchers, show=5)
+        manager.alerter.flush()
+        return
+
+    if args.daemon:
+        AgentDaemon(manager, auditor, scan_interval=args.scan_interval, port=args.port).run()
+        return
+
     # Headless / Auto Mode
-    if len(sys.argv) > 1 and sys.argv[1] == '--auto':
+    if args.auto:
         print("🤖 CLOUD AGENT MODE: Starting automated scan...")
-        scanned, added = ai_scan_simulation(manager)
-        if added > 0:
-            manager.save_grants()
-        auditor.log_run(scanned, added)
+        run_scan_cycle(manager, auditor, timer)
         print("✅ [AUTO] Scan complete.")
         return
 
@@ -544,17 +3704,15 @@ def main():
         choice = input("\nSelect command: ").strip()
         
         if choice == '1':
-            scanned, added = ai_scan_simulation(manager)
-            if added > 0:
-                manager.save_grants()
-            auditor.log_run(scanned, added)
+            run_scan_cycle(manager, auditor)
             
         elif choice == '2':
             grants = manager.grants
             print(f"\n📊 STATUS REPORT")
             print(f"Total Grants: {len(grants)}")
-            high_pri = len([g for g in grants if g.get('priority') == 'HIGH'])
-            print(f"High Priority: {high_pri}")
+            print(f"High Priority: {manager.count_by('priority').get('HIGH', 0)}")
+            print(f"Expiring This Week: {len(manager.deadlines.expiring_within(7))}")
+            print(f"Expired (Still Open): {len(manager.deadlines.expired())}")
             print(f"Alerts Sent Session: {manager.alerter.alerts_sent}")
 
         elif choice == '3':
@@ -569,6 +3727,7 @@ def main():
                 "application_link": "https://example.com/test",
                 "summary": "🔔 This is a TEST alert."
             })
+            manager.alerter.flush()
         
         elif choice == '4':
             print("Goodbye! 👋")
@@ -0,0 +1,16 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import grant_agent as ga  # noqa: E402
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Runs the test in an empty directory (grants.js, logs, backups, data, cache) with alerts off."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(ga, 'WEBHOOK_URL', None)
+    return tmp_path
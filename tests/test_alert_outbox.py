@@ -0,0 +1,92 @@
+"""AlertOutbox persistence and AlertManager delivery against a local stub webhook."""
+import http.server
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import grant_agent as ga
+
+
+@pytest.fixture
+def webhook():
+    """Stub webhook receiver; yields (url, list of received payloads)."""
+    received = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # Keep-alive, like a real receiver
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers['Content-Length']))
+            received.append(json.loads(body))
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/hook", received
+    server.shutdown()
+    server.server_close()
+
+
+def test_enqueue_does_not_write_until_saved(workdir):
+    outbox = ga.AlertOutbox()
+    for i in range(200):
+        assert outbox.enqueue(f"k{i}", {"n": i})
+    assert not os.path.exists(ga.ALERT_OUTBOX_FILE)
+    assert outbox.save()
+    assert not outbox.save()  # Nothing changed since
+    assert len(ga.AlertOutbox().pending) == 200
+
+
+def test_deliveries_are_persisted_without_flush(workdir, webhook, monkeypatch):
+    url, received = webhook
+    monkeypatch.setattr(ga, 'ALERT_SAVE_INTERVAL', 0)
+    alerter = ga.AlertManager(webhook_url=url)
+    for i in range(20):
+        alerter.send_webhook({"n": i}, key=f"k{i}")
+    deadline = time.time() + 10
+    while len(received) < 20 and time.time() < deadline:
+        time.sleep(0.05)
+    time.sleep(0.2)  # Let the workers write the outbox after their last delivery
+
+    # A new process (no flush happened) must not resend anything
+    restarted = ga.AlertOutbox()
+    assert len(received) == 20
+    assert restarted.pending == {}
+    assert set(restarted.sent) == {f"k{i}" for i in range(20)}
+    alerter.flush()
+
+
+def test_flush_delivers_and_dedups_across_runs(workdir, webhook):
+    url, received = webhook
+    alerter = ga.AlertManager(webhook_url=url)
+    alerter.send_webhook({"n": 1}, key="same")
+    alerter.flush()
+    again = ga.AlertManager(webhook_url=url)
+    again.send_webhook({"n": 1}, key="same")
+    again.flush()
+    assert received == [{"n": 1}]
+    assert again.metrics['deduped'] == 1
+
+
+def test_metrics_since_counts_only_the_window(workdir, webhook):
+    url, received = webhook
+    alerter = ga.AlertManager(webhook_url=url)
+    alerter.send_webhook({"n": 1}, key="first")
+    alerter.flush()
+    before = dict(alerter.metrics)
+    alerter.send_webhook({"n": 1}, key="first")
+    alerter.send_webhook({"n": 2}, key="second")
+    alerter.flush()
+    delta = alerter.metrics_since(before)
+    assert (delta['queued'], delta['deduped'], delta['sent']) == (1, 1, 1)
+    assert alerter.metrics['sent'] == 2
+    assert alerter.metrics_since(dict(alerter.metrics)) == dict.fromkeys(delta.keys() - {'latency_ms_max'}, 0)
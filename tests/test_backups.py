@@ -0,0 +1,40 @@
+"""BackupStore retention and restore."""
+from datetime import datetime, timedelta
+
+import grant_agent as ga
+
+
+def snapshot_js(n):
+    return ("window.grantsData = " + str([{"id": str(i)} for i in range(n)]).replace("'", '"') + ";").encode('utf-8')
+
+
+def test_one_snapshot_per_day_is_kept(workdir):
+    store = ga.BackupStore()
+    now = datetime(2026, 5, 20, 23, 55)
+    for minutes in range(0, 23 * 60, 5):  # A daemon saving every 5 minutes, two days running
+        for day in (1, 0):
+            store.snapshot(snapshot_js(minutes % 50 + day), taken=now - timedelta(days=day, minutes=minutes))
+    entries = store.entries()
+    assert [e['taken'][:10] for e in entries] == ['2026-05-19', '2026-05-20']
+    assert entries[-1]['taken'] == '2026-05-20T23:55:00'  # The day's latest
+    assert len(list((workdir / 'backups' / 'objects').iterdir())) == 2
+
+
+def test_pre_restore_snapshot_survives_later_saves(workdir):
+    store = ga.BackupStore()
+    yesterday = datetime.now() - timedelta(days=1)
+    store.snapshot(snapshot_js(1), taken=yesterday)
+    with open(ga.GRANTS_FILE, 'wb') as f:
+        f.write(snapshot_js(5))
+
+    assert store.restore(yesterday.strftime("%Y-%m-%d"))
+    with open(ga.GRANTS_FILE, 'rb') as f:
+        assert f.read() == snapshot_js(1)
+    store.snapshot(snapshot_js(2))
+    store.snapshot(snapshot_js(3))
+
+    today = [e for e in store.entries() if e['taken'][:10] == datetime.now().strftime("%Y-%m-%d")]
+    assert len(today) == 2
+    pre_restore = next(e for e in today if e.get('pre_restore'))
+    assert store.read(pre_restore) == snapshot_js(5)
+    assert store.read(next(e for e in today if not e.get('pre_restore'))) == snapshot_js(3)
@@ -0,0 +1,68 @@
+"""DashboardExporter output and when GrantManager.save_grants refreshes it."""
+import glob
+import json
+
+import grant_agent as ga
+
+
+def finding(i, **fields):
+    grant = {
+        "program_name": f"Test Program {i}",
+        "provider": "Test Provider",
+        "country": "Global",
+        "sector_focus": "AI, SaaS",
+        "funding_type": "Grant",
+        "funding_amount": "$10,000",
+        "eligibility_summary": f"Startups building tool number {i}.",
+        "deadline": "2099-01-01",
+        "application_link": f"https://example.org/programs/{i}",
+    }
+    grant.update(fields)
+    return grant
+
+
+def exported_text():
+    return "".join(open(path, encoding='utf-8').read() for path in glob.glob('data/grants-*.js'))
+
+
+def test_hand_edit_of_grants_js_is_exported(workdir):
+    manager = ga.GrantManager(storage_mode='snapshot')
+    manager.add_grants([finding(i) for i in range(5)])
+    assert manager.save_grants()
+
+    with open(ga.GRANTS_FILE, encoding='utf-8') as f:
+        text = f.read()
+    with open(ga.GRANTS_FILE, 'w', encoding='utf-8') as f:
+        f.write(text.replace('"notes": ""', '"notes": "edited by hand"', 1))
+
+    manager = ga.GrantManager(storage_mode='snapshot')
+    manager.load_grants()
+    assert not manager.save_grants()  # Nothing to write back to grants.js...
+    assert "edited by hand" in exported_text()  # ...but data/ follows it
+    assert ga.DashboardExporter().exported_catalog() == manager.catalog_fingerprint()
+
+
+def test_unchanged_export_writes_nothing(workdir):
+    manager = ga.GrantManager(storage_mode='snapshot')
+    manager.add_grants([finding(i) for i in range(5)])
+    manager.save_grants()
+    exporter = ga.DashboardExporter()
+    assert exporter.export(manager.grants, manager.catalog_fingerprint()) == 0
+    assert exporter.bytes_written == 0
+
+
+def read_js(path, prefix):
+    with open(path, encoding='utf-8') as f:
+        return json.loads(f.read()[len(prefix):].rstrip(';'))
+
+
+def test_index_positions_follow_the_manifest_order(workdir):
+    manager = ga.GrantManager(storage_mode='snapshot')
+    manager.add_grants([finding(i) for i in range(5)] + [finding(5, eligibility_summary="OpenAI residency.")])
+    manager.save_grants()
+    manifest = read_js('data/manifest.js', 'window.grantsManifest=')
+    index = read_js('data/index.js', 'window.grantsIndex=')
+    assert index['order_hash'] == manifest['order_hash']
+    order = manifest['order']
+    assert [order[pos] for pos in index['tokens']['openai']] == [manager.generate_id(finding(5))]
+    assert sorted(p for ps in index['status'].values() for p in ps) == list(range(len(order)))
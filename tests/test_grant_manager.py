@@ -0,0 +1,36 @@
+"""GrantManager ingest: dedup and updates."""
+import grant_agent as ga
+
+RICH = {
+    "program_name": "Merge Test Grant", "provider": "Merge Foundation", "country": "India",
+    "sector_focus": "AI", "funding_type": "Grant", "funding_amount": "$25,000",
+    "eligibility_summary": "Early stage AI startups.", "deadline": "2099-06-30",
+    "application_link": "https://example.org/merge", "awards_available": "10 Awards",
+}
+
+
+def sparse(**fields):
+    """What an RSS item gives for the same program: name, provider, link, summary."""
+    grant = {key: RICH[key] for key in ('program_name', 'provider', 'application_link', 'eligibility_summary')}
+    grant.update(fields)
+    return grant
+
+
+def test_sparse_relisting_keeps_known_fields(workdir):
+    manager = ga.GrantManager()
+    assert manager.add_grants([dict(RICH)]) == ["ADDED"]
+    assert manager.add_grants([sparse()]) == ["DUPLICATE"]
+    grant = manager.grants[0]
+    for key in ('country', 'deadline', 'funding_amount', 'awards_available'):
+        assert grant[key] == RICH[key]
+
+
+def test_sparse_update_only_changes_its_own_fields(workdir):
+    manager = ga.GrantManager()
+    manager.add_grants([dict(RICH)])
+    assert manager.add_grants([sparse(application_link="https://example.org/merge-2026", deadline=None)]) == ["UPDATED"]
+    grant = manager.grants[0]
+    assert grant['application_link'] == "https://example.org/merge-2026"
+    assert grant['deadline'] == RICH['deadline']
+    assert grant['deadline_kind'] == ga.DEADLINE_DATE
+    assert grant['relevance_score'] == manager.scorer.calculate_score(grant)
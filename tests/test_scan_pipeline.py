@@ -0,0 +1,234 @@
+"""ScanPipeline and FetchCache against a local stub HTTP server."""
+import http.server
+import json
+import threading
+import time
+
+import pytest
+
+import grant_agent as ga
+
+FEED = [
+    {"program_name": "Stub Seed Grant", "provider": "Stub Foundation", "country": "Global",
+     "sector_focus": "AI", "funding_type": "Grant", "funding_amount": "$50,000",
+     "eligibility_summary": "Early stage startups.", "deadline": "Rolling",
+     "application_link": "https://example.org/seed", "effort_level": "Low"},
+    {"program_name": "Stub Climate Prize", "provider": "Stub Foundation", "country": "Europe",
+     "sector_focus": "Climate", "funding_type": "Prize", "funding_amount": "€100k",
+     "eligibility_summary": "Climate founders.", "deadline": "Open all year",
+     "application_link": "https://example.org/climate", "effort_level": "Medium"},
+]
+# Feeds send null (or numbers) where a string is expected
+SPARSE_FEED = [
+    {"program_name": "Stub Null Grant", "provider": "Stub Foundation", "deadline": None,
+     "funding_amount": None, "eligibility_summary": "Anyone.", "application_link": "https://example.org/null"},
+    {"program_name": "Stub Number Grant", "provider": "Stub Foundation", "deadline": 20991231,
+     "funding_amount": 5000, "eligibility_summary": "Anyone.", "application_link": "https://example.org/number"},
+]
+RSS = b"""<?xml version="1.0"?>
+<rss version="2.0"><channel><title>Stub RSS Fund</title>
+<item><title>RSS Fellowship</title><link>https://example.org/rss-1</link><description>Open source maintainers.</description></item>
+<item><title>RSS Residency</title><link>https://example.org/rss-2</link><description>Researchers.</description></item>
+</channel></rss>"""
+
+
+class StubServer:
+    """ThreadingHTTPServer with canned routes; counts requests and the most requests in flight at once."""
+
+    def __init__(self):
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append(self.path)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    stub.route(self)
+                finally:
+                    with stub.lock:
+                        stub.in_flight -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_address[1]}{path}"
+
+    @staticmethod
+    def send(handler, body, content_type, etag=None):
+        if etag and handler.headers.get('If-None-Match') == etag:
+            handler.send_response(304)
+            handler.end_headers()
+            return
+        handler.send_response(200)
+        handler.send_header('Content-Type', content_type)
+        handler.send_header('Content-Length', str(len(body)))
+        if etag: handler.send_header('ETag', etag)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def route(self, handler):
+        path = handler.path.split('?', 1)[0]
+        if path == '/feed.json':
+            self.send(handler, json.dumps(FEED).encode('utf-8'), 'application/json', etag='"feed-v1"')
+        elif path == '/sparse.json':
+            self.send(handler, json.dumps(SPARSE_FEED).encode('utf-8'), 'application/json')
+        elif path == '/feed.rss':
+            self.send(handler, RSS, 'application/rss+xml', etag='"rss-v1"')
+        elif path == '/error':
+            handler.send_error(500)
+        elif path == '/slow':
+            time.sleep(1.5)
+            self.send(handler, b'[]', 'application/json')
+        elif path == '/busy':
+            time.sleep(0.2)
+            self.send(handler, b'[]', 'application/json')
+        else:
+            handler.send_error(404)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with StubServer() as server:
+        yield server
+
+
+def scan(manager, sources, cache=None, **kwargs):
+    pipeline = ga.ScanPipeline(manager, sources, cache=cache, **kwargs)
+    return pipeline, pipeline.run()
+
+
+def test_json_and_rss_sources_are_ingested(workdir, stub):
+    manager = ga.GrantManager()
+    sources = [ga.JSONFeedSource('json', stub.url('/feed.json')),
+               ga.RSSFeedSource('rss', stub.url('/feed.rss'))]
+    _, (scanned, added, errors) = scan(manager, sources)
+    assert (scanned, added, errors) == (4, 4, [])
+    names = {g['program_name'] for g in manager.grants}
+    assert {'Stub Seed Grant', 'Stub Climate Prize', 'RSS Fellowship', 'RSS Residency'} == names
+    rss = manager.index[ga.grant_id({"program_name": "RSS Fellowship", "provider": "Stub RSS Fund"})]
+    assert rss['application_link'] == 'https://example.org/rss-1'
+
+
+def test_failing_and_slow_sources_are_reported_without_blocking_the_rest(workdir, stub):
+    manager = ga.GrantManager()
+    sources = [ga.JSONFeedSource('broken', stub.url('/error')),
+               ga.JSONFeedSource('slow', stub.url('/slow')),
+               ga.JSONFeedSource('json', stub.url('/feed.json'))]
+    _, (scanned, added, errors) = scan(manager, sources, scan_timeout=0.5)
+    assert (scanned, added) == (2, 2)
+    assert len(errors) == 2
+    assert any(e.startswith('broken: HTTPError') for e in errors)
+    assert 'slow: timed out after 0.5s' in errors
+
+
+def test_per_host_limit(workdir, stub):
+    sources = [ga.JSONFeedSource(f'busy-{i}', stub.url(f'/busy?i={i}')) for i in range(6)]
+    scan(ga.GrantManager(), sources, max_workers=6, per_host_limit=2)
+    assert len(stub.requests) == 6
+    assert stub.max_in_flight == 2
+
+
+def test_unchanged_source_is_skipped_via_cache(workdir, stub):
+    manager = ga.GrantManager()
+    source = ga.JSONFeedSource('json', stub.url('/feed.json'))
+    cache = ga.FetchCache()
+    scan(manager, [source], cache=cache)
+    cache.save()
+
+    cache = ga.FetchCache()
+    pipeline, (scanned, added, errors) = scan(manager, [source], cache=cache)
+    assert (scanned, added, errors) == (0, 0, [])
+    assert pipeline.unchanged == ['json']
+    assert cache.stats['not_modified'] == 1
+
+
+def fail_once(monkeypatch, target, name, error):
+    """Patches target.name to raise error on its first call, then behave normally."""
+    original = getattr(target, name)
+    calls = []
+
+    def patched(*args, **kwargs):
+        calls.append(args)
+        if len(calls) == 1:
+            raise error
+        return original(*args, **kwargs)
+    monkeypatch.setattr(target, name, patched)
+
+
+def test_source_that_failed_to_parse_is_not_cached(workdir, stub, monkeypatch):
+    manager = ga.GrantManager()
+    source = ga.JSONFeedSource('json', stub.url('/feed.json'))
+    fail_once(monkeypatch, source, 'parse', ValueError("bad feed"))
+    cache = ga.FetchCache()
+    _, (_, _, errors) = scan(manager, [source], cache=cache)
+    assert errors == ['json: ValueError: bad feed']
+    cache.save()
+
+    # Same body and ETag next run: it must be parsed and ingested, not skipped as unchanged
+    _, (scanned, added, errors) = scan(manager, [source], cache=ga.FetchCache())
+    assert (scanned, added, errors) == (2, 2, [])
+
+
+def test_source_that_failed_to_ingest_is_not_cached(workdir, stub, monkeypatch):
+    manager = ga.GrantManager()
+    source = ga.JSONFeedSource('json', stub.url('/feed.json'))
+    fail_once(monkeypatch, manager, 'add_grants', RuntimeError("disk full"))
+    cache = ga.FetchCache()
+    _, (_, _, errors) = scan(manager, [source], cache=cache)
+    assert errors == ['json: ingest failed: RuntimeError: disk full']
+    cache.save()
+
+    _, (scanned, added, errors) = scan(manager, [source], cache=ga.FetchCache())
+    assert (scanned, added, errors) == (2, 2, [])
+
+
+def test_ingest_failure_is_reported_and_other_sources_still_ingested(workdir, stub, monkeypatch):
+    manager = ga.GrantManager()
+    fail_once(monkeypatch, manager, 'add_grants', RuntimeError("boom"))
+    sources = [ga.JSONFeedSource('first', stub.url('/feed.json')),
+               ga.RSSFeedSource('second', stub.url('/feed.rss'))]
+    _, (_, added, errors) = scan(manager, sources, max_workers=1)
+    assert added == 2
+    assert len(errors) == 1 and 'ingest failed: RuntimeError: boom' in errors[0]
+
+
+def test_null_and_numeric_fields_are_ingested(workdir, stub):
+    manager = ga.GrantManager()
+    _, (scanned, added, errors) = scan(manager, [ga.JSONFeedSource('sparse', stub.url('/sparse.json'))])
+    assert (scanned, added, errors) == (2, 2, [])
+    assert {g['deadline_kind'] for g in manager.grants} == {ga.DEADLINE_UNKNOWN}
+
+
+def test_broken_sources_json_is_logged_as_a_run_error(workdir, stub):
+    with open(ga.SOURCES_FILE, 'w', encoding='utf-8') as f:
+        json.dump([{"type": "json", "name": "json", "url": stub.url('/feed.json')},
+                   {"type": "atom", "name": "atom", "url": stub.url('/feed.atom')},
+                   {"type": "rss", "name": "rss", "url": stub.url('/feed.rss'), "colour": "red"}], f)
+    entry = ga.run_scan_cycle(ga.GrantManager(), ga.Auditor())
+    assert entry['grants_added'] == 2
+    assert [e.split(':')[0] for e in entry['errors']] == [f'{ga.SOURCES_FILE} #2', f'{ga.SOURCES_FILE} #3']
+
+    with open(ga.SOURCES_FILE, 'w', encoding='utf-8') as f:
+        f.write('[{"type": "json",')
+    entry = ga.run_scan_cycle(ga.GrantManager(), ga.Auditor())
+    assert entry['grants_scanned'] == 0
+    assert len(entry['errors']) == 1 and entry['errors'][0].startswith(ga.SOURCES_FILE)
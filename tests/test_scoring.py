@@ -0,0 +1,66 @@
+"""GrantScorer: batch scoring must match calculate_score grant by grant."""
+from datetime import datetime, timedelta
+
+import pytest
+
+import benchmark
+import grant_agent as ga
+
+PROFILE = {"name": "test", "base": 70,
+           "keywords": {"eligibility": {"student*": -50, "early stage": 15},
+                        "sector": {"ai": 20, "non-profit": -40}, "any": {"women": 5}}}
+
+
+@pytest.fixture(params=['numpy', 'python'])
+def numpy_mode(request, monkeypatch):
+    if request.param == 'numpy':
+        if ga.np is None:
+            pytest.skip("numpy not installed")
+    else:
+        monkeypatch.setattr(ga, 'np', None)
+    return request.param
+
+
+def catalog(n=2000):
+    today = datetime(2026, 3, 10, 15, 30)
+    grants = benchmark.generate_catalog(n, seed=7)
+    # Every urgency threshold, plus the undated kinds
+    for i, days in enumerate([-1, 0, 1, 6, 7, 29, 30, 90, 91]):
+        grants[i]['deadline'] = (today + timedelta(days=days)).strftime("%Y-%m-%d")
+    grants[10]['deadline'] = 'Open all year'
+    grants[11]['deadline'] = 'Rolling basis'
+    grants[12]['deadline'] = None
+    grants[13]['funding_type'] = None
+    grants[14]['sector_focus'] = 'Non-profit AI'
+    grants[15]['eligibility_summary'] = 'Students only.'
+    grants[16].pop('source_category', None)
+    for g in grants:
+        g['id'] = ga.grant_id(g)
+        g['fingerprint'] = ga.content_fingerprint(g)
+    return grants, today
+
+
+def scorer_for(matcher):
+    """A scorer with this matcher (None: the built-in rules), whatever profile.json says."""
+    scorer = ga.GrantScorer()
+    scorer.matcher = matcher
+    return scorer
+
+
+@pytest.mark.parametrize('profile', [None, PROFILE])
+def test_score_many_matches_calculate_score(workdir, numpy_mode, profile):
+    grants, now = catalog()
+    scorer = scorer_for(ga.ProfileMatcher(profile) if profile else None)
+    expected = [scorer.calculate_score(g, now) for g in grants]
+    scores, priorities = scorer.score_many(grants, now=now)
+    assert scores == expected
+    assert priorities == [scorer.determine_priority(s) for s in expected]
+
+
+def test_score_matrix_matches_one_scorer_per_profile(workdir, numpy_mode):
+    grants, now = catalog(500)
+    matchers = [None, ga.ProfileMatcher(PROFILE)]
+    matrix = scorer_for(None).score_matrix(grants, matchers, now=now)
+    for matcher, (scores, _) in zip(matchers, matrix):
+        single = scorer_for(matcher)
+        assert scores == [single.calculate_score(g, now) for g in grants]
@@ -0,0 +1,208 @@
+"""grants.js parsing and the storage backends: what is saved is what loads back."""
+import json
+
+import pytest
+
+import grant_agent as ga
+
+
+def finding(i, **fields):
+    grant = {
+        "program_name": f"Storage Program {i}", "provider": "Storage Provider", "country": "Global",
+        "sector_focus": "AI, Climate", "funding_type": "Grant", "funding_amount": "$10,000",
+        "eligibility_summary": f"Teams working on problem {i}.", "deadline": "2099-01-01",
+        "application_link": f"https://example.org/storage/{i}",
+    }
+    grant.update(fields)
+    return grant
+
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+# --- iter_grants_file ---
+
+def test_reads_grants_js_and_plain_json(workdir):
+    grants = [{"id": str(i), "program_name": f"P{i}"} for i in range(3)]
+    write('a.js', "window.grantsData = " + json.dumps(grants, indent=2) + ";\n")
+    write('b.json', json.dumps(grants))
+    write('c.js', "window.grantsData=[];")
+    assert list(ga.iter_grants_file('a.js')) == grants
+    assert list(ga.iter_grants_file('b.json')) == grants
+    assert list(ga.iter_grants_file('c.js')) == []
+
+
+def test_grants_split_across_read_chunks(workdir):
+    grants = [{"id": str(i), "program_name": "x" * 50, "notes": "é,]}" * i} for i in range(40)]
+    write('grants.js', "window.grantsData = " + json.dumps(grants, indent=2, ensure_ascii=False) + ";")
+    for chunk_size in (1, 7, 64, 1000):
+        assert list(ga.iter_grants_file('grants.js', chunk_size=chunk_size)) == grants
+
+
+@pytest.mark.parametrize('text', [
+    'window.grantsData = [{"id": "1"}, {"id": "2"',          # Truncated mid-object
+    'window.grantsData = [{"id": "1"}, {"id": "2"}',         # Truncated before ']'
+    'window.grantsData = [{"id": "1"} {"id": "2"}];',        # Missing comma
+    'window.grantsData = [{"id": "1"}, 42];',                # Not an object
+    'window.grantsData = {"id": "1"};',                      # Not an array
+    'window.grantsData = [{"id": "1"}]; alert(1)',           # Trailing content
+    'window.grantsData [{"id": "1"}];',                      # No '='
+    'window.grantsDataX = [{"id": "1"}];',                   # Another identifier
+    '',
+])
+def test_malformed_grants_js_raises(workdir, text):
+    write('grants.js', text)
+    for chunk_size in (4, 64 * 1024):
+        with pytest.raises(ga.GrantsFileError):
+            list(ga.iter_grants_file('grants.js', chunk_size=chunk_size))
+
+
+def test_malformed_grants_js_is_never_loaded_as_empty(workdir):
+    write(ga.GRANTS_FILE, 'window.grantsData = [{"program_name": "A"},')
+    with pytest.raises(ga.GrantsFileError):
+        ga.GrantManager(storage_mode='snapshot').load_grants()
+
+
+# --- GrantManager.iter_grants ---
+
+@pytest.mark.parametrize('mode', ['snapshot', 'journal', 'sqlite'])
+def test_iter_grants_streams_what_load_grants_loads(workdir, mode):
+    manager = ga.GrantManager(storage_mode=mode)
+    manager.add_grants([finding(i) for i in range(5)])
+    manager.save_grants(full=True)  # grants.js holds these five
+    manager.add_grants([finding(i) for i in range(5, 8)])  # New: journaled in journal mode
+    manager.add_grants([finding(1, deadline="2099-02-02")])  # Updated
+    manager.save_grants()
+
+    loaded = ga.GrantManager(storage_mode=mode)
+    loaded.load_grants()
+    expected = [g.copy() for g in loaded.grants]
+    assert [dict(g) for g in loaded.iter_grants()] == expected
+    assert len(expected) == 8
+    assert expected[0]['program_name'] == 'Storage Program 7'
+    assert next(g for g in expected if g['program_name'] == 'Storage Program 1')['deadline'] == "2099-02-02"
+
+
+# --- Journal ---
+
+def journal_manager():
+    """Journal mode with five grants in grants.js and two more saves journaled on top."""
+    manager = ga.GrantManager(storage_mode='journal')
+    manager.add_grants([finding(i) for i in range(5)])
+    manager.save_grants(full=True)
+    manager.add_grants([finding(5), finding(0, funding_amount="$20,000")])
+    manager.save_grants()
+    manager.add_grants([finding(6)])
+    manager.save_grants()
+    return manager
+
+
+def test_journal_replay_restores_the_catalog(workdir):
+    manager = journal_manager()
+    with open(ga.JOURNAL_FILE, encoding='utf-8') as f:
+        assert len(f.readlines()) == 3
+    loaded = ga.GrantManager(storage_mode='journal')
+    loaded.load_grants()
+    assert [g.copy() for g in loaded.grants] == [g.copy() for g in manager.grants]
+    assert loaded.catalog_fingerprint() == manager.catalog_fingerprint()
+
+
+def test_journal_replay_is_idempotent_across_modes(workdir):
+    manager = journal_manager()
+    loaded = ga.GrantManager(storage_mode='snapshot')  # Snapshot mode still replays a leftover journal
+    loaded.load_grants()
+    assert loaded.catalog_fingerprint() == manager.catalog_fingerprint()
+
+
+def test_torn_journal_tail_is_skipped_then_truncated(workdir):
+    manager = journal_manager()
+    with open(ga.JOURNAL_FILE, 'ab') as f:
+        f.write(b'{"op": "upsert", "ts": "2026-01-01", "grant": {"id": "torn", "program_na')  # Crash mid-append
+
+    loaded = ga.GrantManager(storage_mode='journal')
+    loaded.load_grants()  # The torn record is ignored
+    assert loaded.catalog_fingerprint() == manager.catalog_fingerprint()
+
+    # The next append cuts the torn bytes first, so the new record gets a line of its own
+    loaded.add_grants([finding(7)])
+    loaded.save_grants()
+    with open(ga.JOURNAL_FILE, encoding='utf-8') as f:
+        lines = f.readlines()
+    assert len(lines) == 4 and all(line.endswith('\n') for line in lines)
+    reloaded = ga.GrantManager(storage_mode='journal')
+    reloaded.load_grants()
+    assert len(reloaded.grants) == 8
+    assert reloaded.catalog_fingerprint() == loaded.catalog_fingerprint()
+
+
+def test_corrupt_journal_record_before_the_end_raises(workdir):
+    journal_manager()
+    with open(ga.JOURNAL_FILE, encoding='utf-8') as f:
+        lines = f.readlines()
+    lines[1] = lines[1][:20] + '\n'
+    write(ga.JOURNAL_FILE, ''.join(lines))
+    with pytest.raises(ga.GrantsFileError):
+        ga.GrantManager(storage_mode='journal').load_grants()
+
+
+def test_truncate_torn_tail(workdir):
+    write('j.jsonl', '{"a": 1}\n{"b": 2}\n{"c": ')
+    assert ga.truncate_torn_tail('j.jsonl', chunk_size=3) == len('{"c": ')
+    assert open('j.jsonl', encoding='utf-8').read() == '{"a": 1}\n{"b": 2}\n'
+    assert ga.truncate_torn_tail('j.jsonl') == 0
+    write('k.jsonl', '{"torn": ')
+    assert ga.truncate_torn_tail('k.jsonl') == len('{"torn": ')
+    assert open('k.jsonl', encoding='utf-8').read() == ''
+
+
+# --- Grant records ---
+
+ODD_GRANT = {
+    "program_name": "Ünïcode Grant ✓", "provider": "Odd Provider", "country": "India",
+    "sector_focus": "Non-profit, EdTech", "funding_type": "Equity", "funding_amount": "Up to ₹1 Crore",
+    "eligibility_summary": "Line one.\nLine \"two\".", "deadline": "Rolling", "application_link": "https://example.org/odd",
+    "required_documents": ["Pitch deck", "Financials"],
+    "custom_field": {"nested": [1, 2, None]},  # Unknown to Grant: kept as an extra
+    "awards_available": None,
+}
+
+
+def test_grant_is_the_dict_it_was_built_from():
+    raw = dict(ODD_GRANT, id="x", categories=["EdTech", "Non-Profit"])
+    grant = ga.Grant(raw)
+    assert grant == raw
+    assert grant.to_dict() == raw
+    assert list(grant.to_dict()) == list(raw)  # Key order too
+    assert json.dumps(grant, default=ga.grant_json) == json.dumps(raw)
+    grant['notes'] = "added"
+    del grant['custom_field']
+    assert list(grant) == [k for k in raw if k != 'custom_field'] + ['notes']
+
+
+@pytest.mark.parametrize('mode', ['snapshot', 'journal', 'sqlite'])
+def test_grant_records_round_trip_through_save_and_load(workdir, monkeypatch, mode):
+    manager = ga.GrantManager(storage_mode=mode)
+    assert manager.compact
+    manager.add_grants([dict(ODD_GRANT), finding(1)])
+    manager.grants[0]['status'] = 'Applied'
+    manager.dirty[manager.grants[0]['id']] = None
+    manager.save_grants(full=True)
+    saved = [g.copy() for g in manager.grants]
+    with open(ga.GRANTS_FILE, 'rb') as f:
+        snapshot = f.read()
+
+    loaded = ga.GrantManager(storage_mode=mode)
+    loaded.load_grants()
+    assert all(isinstance(g, ga.Grant) for g in loaded.grants)
+    assert [g.copy() for g in loaded.grants] == saved
+
+    # The same file loaded as plain dicts: identical catalog, and identical grants.js when written back
+    monkeypatch.setattr(ga, 'COMPACT_GRANTS', False)
+    plain = ga.GrantManager(storage_mode=mode)
+    plain.load_grants()
+    assert all(type(g) is dict for g in plain.grants)
+    assert plain.grants == saved
+    assert plain.catalog_fingerprint() == loaded.catalog_fingerprint()
+    assert ga.snapshot_bytes(plain.grants) == ga.snapshot_bytes(loaded.grants) == snapshot